@@ -0,0 +1,107 @@
+"""Локальная замена Dadata geolocate/address для бенчмарков.
+
+По точке отвечает адресом дома синтетической базы (benchmarks.synthetic) в
+формате Dadata, с настраиваемой задержкой и долей ошибок.
+
+Запуск: uv run python -m benchmarks.fake_dadata --db benchmarks/data/codes.db
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic import house_at
+
+
+class FakeDadataHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело пишутся в сокет отдельно: с алгоритмом Нейгла тело
+    # ждёт ACK клиента и добавляет к задержке десятки миллисекунд
+    disable_nagle_algorithm = True
+
+    houses: list[tuple[str, str, str, str]] = []
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    rng = random.Random(0)
+    lock = threading.Lock()
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        delay = self.latency
+        with self.lock:
+            if self.jitter > 0:
+                delay += self.rng.expovariate(1 / self.jitter)
+            failed = self.rng.random() < self.error_rate
+        time.sleep(delay)
+
+        if failed:
+            self.respond(500, {"message": "Internal Server Error"})
+            return
+
+        point = json.loads(body)
+        house_id = house_at(point["lat"], point["lon"])
+        suggestions = []
+        if 0 <= house_id < len(self.houses):
+            city, _, street, house = self.houses[house_id]
+            suggestions.append(
+                {"data": {"city": city, "street": street, "house": house}}
+            )
+
+        self.respond(200, {"suggestions": suggestions})
+
+    def respond(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def load_houses(db_name: str) -> list[tuple[str, str, str, str]]:
+    """Дома в порядке создания, как в benchmarks.synthetic"""
+    with sqlite3.connect(db_name) as connection:
+        return connection.execute(
+            "SELECT city, street_type, street, house FROM codes "
+            "GROUP BY city, street_type, street, house ORDER BY MIN(id)"
+        ).fetchall()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default="benchmarks/data/codes.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency-ms", type=float, default=100, help="Задержка")
+    parser.add_argument(
+        "--jitter-ms", type=float, default=0, help="Среднее экспоненциального хвоста"
+    )
+    parser.add_argument("--error-rate", type=float, default=0, help="Доля ответов 500")
+    args = parser.parse_args()
+
+    FakeDadataHandler.houses = load_houses(args.db)
+    FakeDadataHandler.latency = args.latency_ms / 1000
+    FakeDadataHandler.jitter = args.jitter_ms / 1000
+    FakeDadataHandler.error_rate = args.error_rate
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeDadataHandler)
+    server.daemon_threads = True
+    print(
+        f"Fake Dadata on http://{args.host}:{args.port}, "
+        f"{len(FakeDadataHandler.houses)} houses",
+        flush=True,
+    )
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Нагрузочный тест API и обработчиков VK-бота на синтетических данных.
+
+Поднимает фейковую Dadata и API под granian, прогоняет набор запросов из
+corpus.json с заданным количеством одновременных запросов и сохраняет
+p50/p95/p99, пропускную способность и RSS каждого воркера (по /proc, Linux).
+
+Запуск:
+    uv run python -m benchmarks.synthetic --out benchmarks/data
+    uv run python -m benchmarks.load --data benchmarks/data --workers 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from pathlib import Path
+
+from pyreqwest.client import Client, ClientBuilder
+
+from benchmarks.results import latency_summary, save_result
+
+Request = Callable[[], Awaitable[bool]]
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as file:
+        for line in file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def descendants(pid: int) -> list[int]:
+    children = []
+    for task in Path(f"/proc/{pid}/task").iterdir():
+        for child in (task / "children").read_text().split():
+            children.append(int(child))
+            children += descendants(int(child))
+    return children
+
+
+def workers_rss(server_pid: int) -> list[float]:
+    """RSS воркеров granian в МиБ, либо главного процесса, если воркеров нет"""
+    pids = descendants(server_pid) or [server_pid]
+    return [round(rss_mb(pid), 1) for pid in pids]
+
+
+class FakeVkMethods:
+    def send(self, **kwargs: object) -> int:
+        return 1
+
+    def getById(self, **kwargs: object) -> dict:  # noqa: N802
+        return {"items": [{"conversation_message_id": 1}]}
+
+    def isMember(self, **kwargs: object) -> int:  # noqa: N802
+        return 1
+
+
+class FakeVk:
+    """VK API, который ничего не отправляет"""
+
+    messages = groups = FakeVkMethods()
+
+
+class MemoryStorage:
+    """Хранилище ключ-значение в памяти вместо Redis для бота"""
+
+    def __init__(self) -> None:
+        self.data: dict[str, object] = {}
+
+    async def get(self, key: str) -> object:
+        return self.data.get(key)
+
+    async def set(self, key: str, value: object, ttl: int | None = None) -> None:
+        self.data[key] = value
+
+
+def make_bot_handler(host: str, port: int) -> object:
+    os.environ.update(
+        DOMOFOMKA_API_HOST=host,
+        DOMOFOMKA_API_PORT=str(port),
+        VK_GROUP_TOKEN="benchmark",
+        VK_GROUP_ID="0",
+        REDIS_HOST="localhost",
+        REDIS_PORT="6379",
+        CACHE_EXPIRE_TIME="1200",
+        ANTI_SPAM_TIME="5",
+    )
+    from src.vkbot.handlers import MessageHandler
+
+    return MessageHandler(FakeVk(), MemoryStorage())
+
+
+def build_requests(
+    scenario: str, corpus: dict, client: Client, url: str, handler: object
+) -> list[Request]:
+    def get(path: str, query: dict) -> Request:
+        async def request() -> bool:
+            response = await client.get(f"{url}{path}").query(query).build().send()
+            await response.bytes()
+            return response.status == 200
+
+        return request
+
+    def bot(event: dict) -> Request:
+        async def request() -> bool:
+            await handler.handle_message(event)
+            return True
+
+        return request
+
+    if scenario == "msg":
+        return [get("/codes/msg", {"message": msg}) for msg in corpus["messages"]]
+
+    if scenario == "geo":
+        return [
+            get("/codes/geo", {"lat": lat, "lon": lon}) for lat, lon in corpus["points"]
+        ]
+
+    # Бот: сообщения и геопозиции вперемешку
+    requests = []
+    for i, (msg, (lat, lon)) in enumerate(
+        zip(corpus["messages"], corpus["points"], strict=True)
+    ):
+        message: dict = {"from_id": i, "text": msg}
+        if i % 2:
+            message["geo"] = {"coordinates": {"latitude": lat, "longitude": lon}}
+        requests.append(bot({"message": message}))
+    return requests
+
+
+async def drive(requests: list[Request], concurrency: int) -> dict[str, float]:
+    latencies: list[float] = []
+    errors = 0
+    position = 0
+
+    async def worker() -> None:
+        nonlocal errors, position
+        while position < len(requests):
+            request = requests[position]
+            position += 1
+
+            started = time.perf_counter()
+            try:
+                ok = await request()
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(requests),
+        "errors": errors,
+        "throughput_rps": round(len(requests) / elapsed, 1),
+        **latency_summary(latencies),
+    }
+
+
+async def wait_ready(client: Client, url: str, timeout: float = 120) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            response = await client.get(f"{url}/ready").build().send()
+            if response.status == 200:
+                return time.perf_counter() - started
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"API at {url} is not ready after {timeout}s")
+
+
+def start_processes(args: argparse.Namespace) -> list[subprocess.Popen]:
+    db_name = str(Path(args.data) / "codes.db")
+
+    fake_dadata = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.fake_dadata",
+            "--db",
+            db_name,
+            "--port",
+            str(args.dadata_port),
+            "--latency-ms",
+            str(args.dadata_latency_ms),
+            "--jitter-ms",
+            str(args.dadata_jitter_ms),
+        ]
+    )
+
+    env = {
+        **os.environ,
+        "API_HOST": "127.0.0.1",
+        "API_PORT": str(args.port),
+        "DB_NAME": db_name,
+        "DADATA_TOKEN": "benchmark",
+        "DADATA_URL": f"http://127.0.0.1:{args.dadata_port}",
+        "DB_WATCH_INTERVAL": "0",
+    }
+    env.update(item.split("=", 1) for item in args.env)
+
+    api = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "granian",
+            "--interface",
+            "asgi",
+            "src.api.app:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(args.port),
+            "--workers",
+            str(args.workers),
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return [fake_dadata, api]
+
+
+async def run(args: argparse.Namespace) -> None:
+    corpus = json.loads((Path(args.data) / "corpus.json").read_text())
+    corpus = {key: values[: args.requests] for key, values in corpus.items()}
+
+    processes = [] if args.url else start_processes(args)
+    url = args.url or f"http://127.0.0.1:{args.port}"
+    host, port = url.removeprefix("http://").split(":")
+
+    client = (
+        ClientBuilder()
+        .max_connections(args.concurrency)
+        .pool_max_idle_per_host(args.concurrency)
+        .timeout(timedelta(seconds=30))
+        .build()
+    )
+    try:
+        ready = await wait_ready(client, url)
+        print(f"API ready in {ready:.1f}s")
+        if processes:
+            save_result(
+                "startup",
+                {
+                    "workers": args.workers,
+                    "db_size": (Path(args.data) / "codes.db").stat().st_size,
+                    "env": sorted(args.env),
+                },
+                {"time_to_ready_s": round(ready, 3)},
+            )
+
+        handler = make_bot_handler(host, int(port)) if "bot" in args.scenarios else None
+        for scenario in args.scenarios:
+            requests = build_requests(scenario, corpus, client, url, handler)
+            await drive(requests[: args.warmup], args.concurrency)
+            metrics = await drive(requests, args.concurrency)
+
+            if processes:
+                rss = workers_rss(processes[1].pid)
+                print(f"RSS per worker, MiB: {rss}")
+                metrics["rss_max_mb"] = max(rss)
+                metrics["rss_total_mb"] = round(sum(rss), 1)
+
+            save_result(
+                f"load_{scenario}",
+                {
+                    "requests": len(requests),
+                    "concurrency": args.concurrency,
+                    "workers": args.workers,
+                    "db_size": (Path(args.data) / "codes.db").stat().st_size,
+                    "dadata_latency_ms": args.dadata_latency_ms,
+                    "env": sorted(args.env),
+                },
+                metrics,
+            )
+    finally:
+        await client.close()
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--data", default="benchmarks/data", help="Каталог synthetic")
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        default=["msg", "geo", "bot"],
+        choices=["msg", "geo", "bot"],
+    )
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1, help="Воркеров granian")
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--dadata-port", type=int, default=18080)
+    parser.add_argument("--dadata-latency-ms", type=float, default=100)
+    parser.add_argument("--dadata-jitter-ms", type=float, default=0)
+    parser.add_argument(
+        "--env",
+        nargs="*",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Настройки API, например SEARCH_BACKEND=scan",
+    )
+    parser.add_argument("--url", help="Уже запущенный API, без запуска процессов")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Микробенчмарки поиска на синтетической базе: address_exists на строках
+базы (исходная реализация против текущей) и get_data_from_db с разными
+поисковыми бэкендами, без кэша результатов.
+
+Запуск: uv run python -m benchmarks.micro --data benchmarks/data
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sqlite3
+import time
+import typing as tp
+from pathlib import Path
+
+from benchmarks.results import latency_summary, save_result
+
+
+def legacy_address_exists(
+    msg: str, city: str, street: str, house: str, street_type: str
+) -> bool:
+    """Исходная проверка кандидата: сообщение нормализуется цепочкой replace
+    заново для каждого кандидата
+    """
+    msg = (
+        msg.lower()
+        .replace("ё", "е")
+        .replace(",", "")
+        .replace(" дом ", " ")
+        .replace("строение", "с")
+        .replace("корпус", "к")
+        .replace(" ", "")
+        .replace("-", "")
+    )
+
+    city = re.sub(r"\W", "", city).lower()
+    street = street.lower().replace(",", "").replace("-", "").replace("  ", " ")
+    street_split = street.split()
+    house = house.lower()
+
+    if all(word in msg for word in street_split):
+        for word in street_split:
+            msg = msg.replace(word, "", 1)
+
+        if msg.count(house) == 1:
+            msg = msg.replace(house, "")
+
+            if msg:
+                if street_type in msg:
+                    msg = msg.replace(street_type, "")
+
+                res = True
+                for remaining_word in msg.split():
+                    if remaining_word not in city or len(remaining_word) < 4:
+                        res = False
+                        break
+            else:
+                res = True
+        else:
+            res = False
+    else:
+        res = False
+
+    return res
+
+
+async def bench_get_data(
+    messages: list[str], backend: str, payloads: bool, fuzzy: bool
+) -> dict[str, float]:
+    from src.api.config import settings
+    from src.services.codes import create_db_pool, get_data_from_db
+    from src.services.fuzzy import StreetMatcher
+    from src.services.index import CodesIndex
+    from src.services.payloads import HousePayloads
+
+    settings.search_backend = tp.cast(tp.Literal["scan", "index", "fts"], backend)
+    pool = create_db_pool()
+    await pool.open()
+    try:
+        async with pool.acquire() as connection:
+            index = await CodesIndex.build(connection) if backend == "index" else None
+            house_payloads = await HousePayloads.build(connection) if payloads else None
+            streets = await StreetMatcher.build(connection) if fuzzy else None
+
+        latencies = []
+        found = 0
+        for msg in messages:
+            started = time.perf_counter()
+            result = await get_data_from_db(
+                msg, index=index, pool=pool, streets=streets, payloads=house_payloads
+            )
+            latencies.append(time.perf_counter() - started)
+            found += result != b"{}"
+    finally:
+        await pool.close()
+
+    return {
+        "found": found,
+        "mean_us": round(sum(latencies) / len(latencies) * 1e6, 1),
+        **latency_summary(latencies),
+    }
+
+
+def bench_address_exists(
+    messages: list[str], rows: list[tuple[str, str, str, str]]
+) -> dict[str, float]:
+    from src.services.codes import address_exists, address_matches
+    from src.services.normalizer import normalize_message
+
+    checks = len(messages) * len(rows)
+
+    started = time.perf_counter()
+    for msg in messages:
+        for row in rows:
+            legacy_address_exists(msg, *row)
+    legacy = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for msg in messages:
+        for row in rows:
+            address_exists(msg, *row)
+    exists = time.perf_counter() - started
+
+    # Как при поиске: сообщение нормализуется один раз на все кандидаты
+    started = time.perf_counter()
+    for msg in messages:
+        normalized = normalize_message(msg)
+        for row in rows:
+            address_matches(normalized, *row)
+    matches = time.perf_counter() - started
+
+    return {
+        "legacy_address_exists_ns": round(legacy / checks * 1e9, 1),
+        "address_exists_ns": round(exists / checks * 1e9, 1),
+        "address_matches_ns": round(matches / checks * 1e9, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data", default="benchmarks/data", help="Каталог synthetic")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--candidates", type=int, default=2000)
+    parser.add_argument(
+        "--backends", nargs="+", default=["index", "scan"], choices=["index", "scan"]
+    )
+    args = parser.parse_args()
+
+    db_name = str(Path(args.data) / "codes.db")
+    os.environ.update(
+        API_HOST="127.0.0.1", API_PORT="8000", DB_NAME=db_name, DADATA_TOKEN="-"
+    )
+
+    corpus = json.loads((Path(args.data) / "corpus.json").read_text())
+    messages = corpus["messages"][: args.queries]
+    params = {"queries": len(messages), "db_size": Path(db_name).stat().st_size}
+
+    with sqlite3.connect(db_name) as connection:
+        rows = connection.execute(
+            "SELECT city, street, house, street_type FROM codes"
+        ).fetchall()
+    rows = random.Random(0).sample(rows, min(args.candidates, len(rows)))
+
+    save_result(
+        "micro_address_exists",
+        {**params, "candidates": len(rows)},
+        bench_address_exists(messages[:100], rows),
+    )
+
+    for backend in args.backends:
+        for payloads, fuzzy in ((False, False), (True, False), (True, True)):
+            metrics = asyncio.run(bench_get_data(messages, backend, payloads, fuzzy))
+            save_result(
+                "micro_get_data_from_db",
+                {**params, "backend": backend, "payloads": payloads, "fuzzy": fuzzy},
+                metrics,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Хранение результатов бенчмарков и сравнение с предыдущим запуском.
+
+Каждый запуск дописывается строкой в benchmarks/results/<name>.jsonl и
+сравнивается с последним запуском с теми же параметрами на той же машине.
+"""
+
+import json
+import platform
+import subprocess
+import time
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Изменение метрики в худшую сторону больше этой доли считается регрессией
+REGRESSION_THRESHOLD = 0.10
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def latency_summary(latencies: list[float]) -> dict[str, float]:
+    """p50/p95/p99 и максимум в миллисекундах"""
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith(("_rps", "_ops"))
+
+
+def save_result(name: str, params: dict, metrics: dict[str, float]) -> None:
+    """Запись результата и вывод сравнения с предыдущим запуском"""
+    RESULTS_DIR.mkdir(exist_ok=True)
+    path = RESULTS_DIR / f"{name}.jsonl"
+    record = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "params": params,
+        "metrics": metrics,
+    }
+
+    previous = None
+    if path.exists():
+        for line in path.read_text().splitlines():
+            old = json.loads(line)
+            if old["params"] == params and old["host"] == record["host"]:
+                previous = old
+
+    with path.open("a") as file:
+        file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    print(f"\n{name} {json.dumps(params, ensure_ascii=False)}")
+    if previous is not None:
+        print(f"compared with {previous['commit']} at {previous['time']}")
+
+    for metric, value in metrics.items():
+        line = f"  {metric:<24} {value:>12}"
+        old_value = previous["metrics"].get(metric) if previous else None
+        if old_value:
+            change = (value - old_value) / old_value
+            worse = -change if higher_is_better(metric) else change
+            mark = "  REGRESSION" if worse > REGRESSION_THRESHOLD else ""
+            line += f"  {old_value:>12}  {change:+7.1%}{mark}"
+        print(line)
@@ -0,0 +1,272 @@
+"""Синтетическая база codes и воспроизводимый набор запросов для бенчмарков.
+
+Дома раскладываются по сетке координат в порядке создания, поэтому фейковая
+Dadata (benchmarks.fake_dadata) по точке находит дом без отдельной таблицы.
+
+Запуск: uv run python -m benchmarks.synthetic --out benchmarks/data
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import time
+from pathlib import Path
+
+from src.services.locator import COORDS_TABLE
+
+cities = [
+    "Москва",
+    "Санкт-Петербург",
+    "Новосибирск",
+    "Екатеринбург",
+    "Казань",
+    "Нижний Новгород",
+    "Челябинск",
+    "Самара",
+    "Омск",
+    "Ростов-на-Дону",
+    "Уфа",
+    "Красноярск",
+    "Воронеж",
+    "Пермь",
+    "Волгоград",
+    "Краснодар",
+    "Мытищи",
+    "Химки",
+    "Подольск",
+    "Балашиха",
+]
+street_names = [
+    "Ленина",
+    "Мира",
+    "Садовая",
+    "Лесная",
+    "Трофимова",
+    "Вернадского",
+    "Мичурина",
+    "Профсоюзная",
+    "Калинина",
+    "Гагарина",
+    "Пушкина",
+    "Кирова",
+    "Советская",
+    "Школьная",
+    "Заречная",
+    "Полевая",
+    "Строителей",
+    "Маршала Жукова",
+    "Красная Пресня",
+    "Аэропортовская",
+    "Некрасова",
+    "Чехова",
+    "Гоголя",
+    "Лермонтова",
+    "Толстого",
+    "Горького",
+    "Маяковского",
+    "Чкалова",
+    "Суворова",
+    "Кутузова",
+    "Победы",
+    "Октябрьская",
+    "Первомайская",
+    "Комсомольская",
+    "Молодёжная",
+    "Набережная",
+    "Центральная",
+    "Солнечная",
+    "Зелёная",
+    "Береговая",
+]
+street_types = ["улица", "проспект", "переулок", "бульвар", "проезд", "шоссе"]
+code_types = ["yaeda", "delivery", "oldcodes"]
+
+GRID_ORIGIN = (55.0, 37.0)
+GRID_STEP = 0.0005
+GRID_COLUMNS = 1000
+
+
+def house_point(house_id: int) -> tuple[float, float]:
+    """Координаты дома с номером house_id в порядке создания"""
+    row, column = divmod(house_id, GRID_COLUMNS)
+    return GRID_ORIGIN[0] + row * GRID_STEP, GRID_ORIGIN[1] + column * GRID_STEP
+
+
+def house_at(lat: float, lon: float) -> int:
+    """Номер дома, ближайшего к точке на сетке"""
+    row = round((lat - GRID_ORIGIN[0]) / GRID_STEP)
+    column = round((lon - GRID_ORIGIN[1]) / GRID_STEP)
+    if row < 0 or not 0 <= column < GRID_COLUMNS:
+        return -1
+    return row * GRID_COLUMNS + column
+
+
+def street_name(i: int) -> str:
+    name = street_names[i % len(street_names)]
+    return name if i < len(street_names) else f"{i // len(street_names) + 1}-я {name}"
+
+
+def house_number(rng: random.Random, number: int) -> str:
+    suffix = rng.choices(["", "к2", "с1", "а", "к1с1"], weights=[80, 8, 5, 5, 2])[0]
+    return f"{number}{suffix}"
+
+
+def generate_houses(
+    rng: random.Random, cities_count: int, streets: int, houses: int
+) -> list[tuple[str, str, str, str]]:
+    result = []
+    for city in cities[:cities_count]:
+        for i in range(streets):
+            street_type = rng.choice(street_types)
+            for number in range(1, houses + 1):
+                result.append(
+                    (city, street_type, street_name(i), house_number(rng, number))
+                )
+    return result
+
+
+def write_db(
+    path: Path,
+    rng: random.Random,
+    houses: list[tuple[str, str, str, str]],
+    entrances: int,
+    coords: bool,
+) -> int:
+    path.unlink(missing_ok=True)
+    rows = 0
+
+    with sqlite3.connect(path) as connection:
+        connection.execute("""
+            CREATE TABLE codes (
+                "id" INTEGER PRIMARY KEY,
+                "city" TEXT NOT NULL,
+                "street_type" TEXT NOT NULL,
+                "street" TEXT NOT NULL,
+                "house" TEXT NOT NULL,
+                "entrance" TEXT NOT NULL,
+                "code_type" TEXT NOT NULL,
+                "code" TEXT NOT NULL
+            )
+        """)
+
+        # Строки одного дома идут подряд, как и в реальной выгрузке
+        batch = []
+        for house in houses:
+            for entrance in range(1, rng.randint(1, entrances) + 1):
+                for code_type in rng.sample(code_types, rng.randint(1, 3)):
+                    code = f"#{rng.randint(1000, 9999)}"
+                    batch.append((*house, str(entrance), code_type, code))
+
+            if len(batch) >= 10000:
+                rows += len(batch)
+                connection.executemany(
+                    "INSERT INTO codes (city, street_type, street, house, entrance, "
+                    "code_type, code) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    batch,
+                )
+                batch.clear()
+
+        rows += len(batch)
+        connection.executemany(
+            "INSERT INTO codes (city, street_type, street, house, entrance, "
+            "code_type, code) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+
+        if coords:
+            connection.execute(f"""
+                CREATE TABLE {COORDS_TABLE} (
+                    "city" TEXT NOT NULL,
+                    "street_type" TEXT NOT NULL,
+                    "street" TEXT NOT NULL,
+                    "house" TEXT NOT NULL,
+                    "lat" REAL NOT NULL,
+                    "lon" REAL NOT NULL,
+                    PRIMARY KEY (city, street_type, street, house)
+                )
+            """)
+            connection.executemany(
+                f"INSERT INTO {COORDS_TABLE} VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (*house, *house_point(house_id))
+                    for house_id, house in enumerate(houses)
+                ),
+            )
+
+    return rows
+
+
+def make_message(rng: random.Random, house: tuple[str, str, str, str]) -> str:
+    city, street_type, street, number = house
+    message = rng.choice(
+        [
+            f"{street} {number}",
+            f"{city} {street} {number}",
+            f"{city}, {street_type} {street}, дом {number}",
+            f"{street_type} {street} {number}",
+        ]
+    )
+    return message.lower() if rng.random() < 0.5 else message
+
+
+def make_corpus(
+    rng: random.Random, houses: list[tuple[str, str, str, str]], size: int
+) -> dict[str, list]:
+    """Сообщения и точки, часть из них не находит ни одного дома"""
+    messages = []
+    points = []
+    for _ in range(size):
+        if rng.random() < 0.05:
+            messages.append(f"{rng.choice(street_names)}ская {rng.randint(500, 900)}")
+        else:
+            messages.append(make_message(rng, rng.choice(houses)))
+
+        lat, lon = house_point(rng.randrange(len(houses)))
+        # Точка рядом с домом, но в пределах ячейки сетки
+        jitter = GRID_STEP / 4
+        points.append(
+            [
+                round(lat + rng.uniform(-jitter, jitter), 6),
+                round(lon + rng.uniform(-jitter, jitter), 6),
+            ]
+        )
+
+    return {"messages": messages, "points": points}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--out", default="benchmarks/data", help="Каталог для файлов")
+    parser.add_argument("--cities", type=int, default=10)
+    parser.add_argument("--streets", type=int, default=100, help="Улиц в городе")
+    parser.add_argument("--houses", type=int, default=50, help="Домов на улице")
+    parser.add_argument("--entrances", type=int, default=6, help="Подъездов до")
+    parser.add_argument("--corpus", type=int, default=10000, help="Запросов в наборе")
+    parser.add_argument(
+        "--coords", action="store_true", help="Заполнить house_coords координатами"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.cities > len(cities):
+        parser.error(f"at most {len(cities)} cities are supported")
+
+    started = time.perf_counter()
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(args.seed)
+
+    houses = generate_houses(rng, args.cities, args.streets, args.houses)
+    rows = write_db(out / "codes.db", rng, houses, args.entrances, args.coords)
+    corpus = make_corpus(rng, houses, args.corpus)
+    (out / "corpus.json").write_text(json.dumps(corpus, ensure_ascii=False))
+
+    print(
+        f"{out / 'codes.db'}: {len(houses)} houses, {rows} rows, "
+        f"corpus of {args.corpus} queries in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,184 @@
+import asyncio
+import contextlib
 import logging
+import time
+import traceback
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
 
-from litestar import Litestar, get
+from litestar import Litestar, Response, get
+from litestar.datastructures import State
 from litestar.openapi import OpenAPIConfig
 from litestar.openapi.plugins import ScalarRenderPlugin
+from litestar.plugins.prometheus import PrometheusConfig, PrometheusController
 from litestar.response import Redirect
+from litestar.status_codes import HTTP_503_SERVICE_UNAVAILABLE
+from redis.asyncio import Redis
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
 
-from src.api.routes import codes_router
+from src.api.config import settings
+from src.api.routes import admin_router, codes_router
+from src.services.admission import AdmissionLimiter
+from src.services.dadata_client import DadataClient
+from src.services.dataset import DatasetManager
+from src.services.geocache import GeoCache
+from src.services.metrics import mark_process_dead, time_to_ready
+from src.storages.redis import RedisStorage
 from src.version import get_app_info
 
 logger = logging.getLogger(__name__)
 
+# Начало отсчёта времени до готовности воркера
+STARTED_AT = time.perf_counter()
+
+
+@asynccontextmanager
+async def redis_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    """Общее для воркеров хранилище кэшей, если задан REDIS_HOST"""
+    app.state.redis_storage = None
+    if settings.redis_host:
+        redis_client = Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            password=settings.redis_password,
+            socket_connect_timeout=settings.redis_timeout,
+            socket_timeout=settings.redis_timeout,
+            # Кэш не должен задерживать запрос повторными попытками
+            retry=Retry(NoBackoff(), retries=0),
+        )
+        app.state.redis_storage = RedisStorage(redis_client)
+
+    try:
+        yield
+    finally:
+        if app.state.redis_storage is not None:
+            await app.state.redis_storage.client.aclose()
+
+
+@asynccontextmanager
+async def datasets_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    datasets = DatasetManager(settings.db_name, storage=app.state.redis_storage)
+    await datasets.start(watch_interval=settings.db_watch_interval)
+    app.state.datasets = datasets
+    try:
+        yield
+    finally:
+        await datasets.stop()
+
+
+@asynccontextmanager
+async def geo_cache_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    app.state.geo_cache = None
+    if settings.geo_cache_precision > 0:
+        app.state.geo_cache = GeoCache(
+            precision=settings.geo_cache_precision,
+            ttl=settings.geo_cache_ttl,
+            max_entries=settings.geo_cache_max_entries,
+            storage=app.state.redis_storage,
+        )
+
+    yield
+
+
+@asynccontextmanager
+async def dadata_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    dadata = DadataClient(
+        token=settings.dadata_token,
+        cache=app.state.geo_cache,
+        base_url=settings.dadata_url,
+        pool_size=settings.dadata_pool_size,
+        connect_timeout=settings.dadata_connect_timeout,
+        read_timeout=settings.dadata_read_timeout,
+        http2=settings.dadata_http2,
+        deadline=settings.dadata_deadline,
+        breaker_failures=settings.dadata_breaker_failures,
+        breaker_reset=settings.dadata_breaker_reset,
+        hedge=settings.dadata_hedge,
+        hedge_quantile=settings.dadata_hedge_quantile,
+        hedge_min_delay=settings.dadata_hedge_min_delay,
+    )
+    app.state.dadata = dadata
+    try:
+        yield
+    finally:
+        await dadata.close()
+
+
+@asynccontextmanager
+async def warmup_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    """Прогрев данных в фоне: /version отвечает сразу, /ready - после прогрева.
+    Если прогрев не удался, воркер так и остаётся неготовым
+    """
+    app.state.ready_in = None
+    app.state.warmup_error = None
+
+    async def warmup() -> None:
+        try:
+            if settings.warmup_queries > 0:
+                async with app.state.datasets.acquire() as dataset:
+                    await dataset.warmup(settings.warmup_queries)
+        except Exception as e:
+            app.state.warmup_error = repr(e)
+            logger.error(f"Warmup failed: {traceback.format_exc()}")
+            return
+
+        app.state.ready_in = time.perf_counter() - STARTED_AT
+        time_to_ready.set(app.state.ready_in)
+        logger.info(f"API is ready in {app.state.ready_in:.3f}s")
+
+    task = asyncio.create_task(warmup())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
+@asynccontextmanager
+async def admission_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    """Отдельные ограничения для поиска в базе и для запросов в Dadata.
+
+    Поиск по умолчанию ограничен размером пула соединений, иначе допущенные
+    запросы ждали бы соединение без срока и без отказа при перегрузке.
+    """
+    lookup_limit = settings.admission_lookup_limit
+    if lookup_limit is None:
+        lookup_limit = settings.db_pool_size
+
+    app.state.lookup_limiter = AdmissionLimiter(
+        "lookup",
+        limit=lookup_limit,
+        queue_size=settings.admission_lookup_queue,
+        queue_timeout=settings.admission_queue_timeout,
+    )
+    app.state.geo_limiter = AdmissionLimiter(
+        "geo",
+        limit=settings.admission_geo_limit,
+        queue_size=settings.admission_geo_queue,
+        queue_timeout=settings.admission_queue_timeout,
+    )
+    yield
+
+
+@asynccontextmanager
+async def metrics_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    try:
+        yield
+    finally:
+        mark_process_dead()
+
+
+# Длительность и количество запросов по маршрутам, этапы внутри запроса
+# записываются в src.services.metrics
+prometheus_config = PrometheusConfig(
+    app_name="domofomka",
+    prefix="domofomka",
+    group_path=True,
+    exclude=[PrometheusController.path],
+)
+
 
 @get("/", include_in_schema=False)
 async def redirect_to_docs() -> Redirect:
@@ -21,13 +190,49 @@ async def version() -> dict[str, str]:
     return get_app_info()
 
 
+@get("/ready")
+async def ready(state: State) -> Response[dict[str, bool | float | str]]:
+    """Готовность воркера к нагрузке: данные загружены и прогреты"""
+    # Ответ без исключения, чтобы частые проверки не писали трассировку в лог
+    if state.ready_in is None:
+        content: dict[str, bool | float | str] = {"ready": False}
+        if state.warmup_error is not None:
+            content["error"] = f"Warmup failed: {state.warmup_error}"
+        return Response(content, status_code=HTTP_503_SERVICE_UNAVAILABLE)
+
+    return Response(
+        {
+            "ready": True,
+            "data_version": state.datasets.current.version,
+            "time_to_ready": round(state.ready_in, 3),
+        }
+    )
+
+
 app = Litestar(
-    route_handlers=[redirect_to_docs, version, codes_router],
+    route_handlers=[
+        redirect_to_docs,
+        version,
+        ready,
+        codes_router,
+        admin_router,
+        PrometheusController,
+    ],
     openapi_config=OpenAPIConfig(
         title="Domofomka",
         version=get_app_info()["version"],
         render_plugins=[ScalarRenderPlugin()],
         path="/docs",
     ),
+    lifespan=[
+        metrics_lifespan,
+        redis_lifespan,
+        datasets_lifespan,
+        warmup_lifespan,
+        geo_cache_lifespan,
+        dadata_lifespan,
+        admission_lifespan,
+    ],
+    middleware=[prometheus_config.middleware],
     debug=True,
 )
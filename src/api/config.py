@@ -1,3 +1,5 @@
+import typing as tp
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -9,5 +11,64 @@ class Settings(BaseSettings):
     db_name: str
     dadata_token: str
 
+    search_backend: tp.Literal["scan", "index", "fts"] = "index"
+    house_key_lookup: bool = False
+    snapshot_path: str | None = None
+    precompute_payloads: bool = True
+    suggest_index: bool = True
+
+    fuzzy_max_distance: int = 2
+    fuzzy_time_budget_ms: float = 20
+
+    db_pool_size: int = 4
+    export_pool_size: int = 2
+    db_mmap_size: int = 256 * 1024 * 1024
+    db_cache_size: int = -64 * 1024
+
+    result_cache_max_entries: int = 10000
+    result_cache_max_bytes: int = 64 * 1024 * 1024
+    result_cache_ttl: int = 3600
+    codes_cache_control: str = "public, max-age=300"
+    shared_cache_ttl: int = 3600
+    shared_cache_beta: float = 1.0
+
+    db_watch_interval: float = 5.0
+    warmup_queries: int = 20
+    admin_token: str | None = None
+    export_token: str | None = None
+
+    # По умолчанию равно db_pool_size: допущенный запрос сразу получает соединение
+    admission_lookup_limit: int | None = None
+    admission_lookup_queue: int = 64
+    admission_geo_limit: int = 16
+    admission_geo_queue: int = 32
+    admission_queue_timeout: float = 1.0
+    admission_retry_after: int = 1
+
+    batch_max_size: int = 500
+    dadata_batch_concurrency: int = 10
+
+    dadata_url: str = "https://suggestions.dadata.ru/suggestions/api/4_1/rs"
+    dadata_pool_size: int = 10
+    dadata_connect_timeout: float = 2.0
+    dadata_read_timeout: float = 5.0
+    dadata_http2: bool = True
+    dadata_deadline: float = 3.0
+    dadata_breaker_failures: int = 5
+    dadata_breaker_reset: float = 30.0
+    dadata_hedge: bool = False
+    dadata_hedge_quantile: float = 0.95
+    dadata_hedge_min_delay: float = 0.05
+
+    geo_cache_precision: int = 8
+    geo_cache_ttl: int = 24 * 3600
+    geo_cache_max_entries: int = 10000
+    geo_local_max_distance: float = 50
+
+    redis_host: str | None = None
+    redis_port: int = 6379
+    redis_password: str | None = None
+    redis_timeout: float = 0.5
+
 
 settings = Settings()
@@ -1,36 +1,418 @@
+import asyncio
+import contextlib
 import logging
+from collections.abc import AsyncGenerator, AsyncIterable
+from dataclasses import dataclass
+from datetime import UTC, datetime
 
-from litestar import Router, get
+import msgspec
+from litestar import MediaType, Response, Router, get, post
+from litestar.datastructures import State
 from litestar.di import Provide
+from litestar.exceptions import (
+    PermissionDeniedException,
+    ServiceUnavailableException,
+    ValidationException,
+)
+from litestar.params import Parameter
+from litestar.response import Stream
+from litestar.status_codes import (
+    HTTP_304_NOT_MODIFIED,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
 
 from src.api.config import settings
-from src.services.codes import get_data_from_db
-from src.services.dadata_client import DadataClient
+from src.services.admission import AdmissionLimiter, OverloadedError
+from src.services.dadata_client import DadataClient, DadataUnavailableError
+from src.services.dataset import CodesDataset, DatasetManager
+from src.services.export import iter_houses, ndjson_chunks
+from src.services.geocache import GeoCache
+from src.services.metrics import timed
+from src.services.payloads import EMPTY_PAYLOAD
+from src.version import get_app_info
 
 logger = logging.getLogger(__name__)
 
 
-async def get_dadata_client() -> DadataClient:
-    return DadataClient(token=settings.dadata_token)
+@dataclass
+class Point:
+    lat: float
+    lon: float
+
+
+async def get_dadata_client(state: State) -> DadataClient:
+    return state.dadata
+
+
+async def get_lookup_limiter(state: State) -> AdmissionLimiter:
+    return state.lookup_limiter
+
+
+async def get_geo_limiter(state: State) -> AdmissionLimiter:
+    return state.geo_limiter
+
+
+async def get_dataset(state: State) -> AsyncGenerator[CodesDataset, None]:
+    datasets: DatasetManager = state.datasets
+    async with datasets.acquire() as dataset:
+        yield dataset
+
+
+# Отказы не должны попадать в кэши клиентов и прокси
+NO_STORE = {"Cache-Control": "no-store"}
+
+
+def cache_headers(dataset: CodesDataset) -> dict[str, str]:
+    """ETag по версиям приложения и файла базы: ответ на тот же запрос меняется
+    только вместе с ними
+    """
+    headers = {"ETag": f'"{get_app_info()["version"]}-{dataset.version}"'}
+    if settings.codes_cache_control:
+        headers["Cache-Control"] = settings.codes_cache_control
+    return headers
+
+
+def is_not_modified(etag: str, if_none_match: str | None) -> bool:
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+def not_modified_response(headers: dict[str, str]) -> Response[None]:
+    return Response(None, status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+
+
+def overloaded_response(error: OverloadedError) -> Response[dict]:
+    """Быстрый отказ при перегрузке, без исключения, чтобы под нагрузкой
+    не писать трассировку в лог на каждый отклонённый запрос
+    """
+    return Response(
+        {"status_code": HTTP_503_SERVICE_UNAVAILABLE, "detail": str(error)},
+        status_code=HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(settings.admission_retry_after), **NO_STORE},
+    )
 
 
 @get("/msg")
-async def get_codes_by_message(message: str) -> dict[str, dict]:
-    return await get_data_from_db(message)
+async def get_codes_by_message(
+    message: str,
+    dataset: CodesDataset,
+    lookup_limiter: AdmissionLimiter,
+    if_none_match: str | None = Parameter(header="If-None-Match", default=None),
+) -> Response[bytes | dict | None]:
+    headers = cache_headers(dataset)
+    # Данные не изменились с прошлого ответа клиенту, база не читается
+    if is_not_modified(headers["ETag"], if_none_match):
+        return not_modified_response(headers)
+
+    try:
+        payload = await dataset.get_data(message, admission=lookup_limiter)
+    except OverloadedError as e:
+        return overloaded_response(e)
+
+    return Response(payload, media_type=MediaType.JSON, headers=headers)
 
 
 @get("/geo")
 async def get_codes_by_geo(
     lat: float,
     lon: float,
+    *,
     dadata: DadataClient,
-) -> dict[str, dict]:
-    address = await dadata.get_address_by_geo(lat=lat, lon=lon)
-    return await get_data_from_db(address)
+    dataset: CodesDataset,
+    lookup_limiter: AdmissionLimiter,
+    geo_limiter: AdmissionLimiter,
+) -> Response[bytes | dict]:
+    """ETag и Cache-Control отдаются только с ответом, полученным из данных.
+    Запрос не проверяется по If-None-Match: адрес точки неизвестен до ответа
+    Dadata, поэтому по одной версии данных нельзя понять, изменился ли ответ.
+    """
+    # Сначала ближайший дом по загруженным координатам, Dadata - если рядом
+    # нет известных домов
+    with timed("locate"):
+        house = dataset.locate(lat, lon)
+    if house is not None:
+        payload = await dataset.get_house_data(house)
+    else:
+        try:
+            address = await dadata.get_address_by_geo(
+                lat=lat, lon=lon, admission=geo_limiter
+            )
+            payload = await dataset.get_data(address, admission=lookup_limiter)
+        except OverloadedError as e:
+            return overloaded_response(e)
+        except DadataUnavailableError as e:
+            raise ServiceUnavailableException(str(e), headers=NO_STORE) from e
+
+    return Response(payload, media_type=MediaType.JSON, headers=cache_headers(dataset))
+
+
+def check_batch_size(size: int) -> None:
+    if size > settings.batch_max_size:
+        raise ValidationException(
+            f"Batch size {size} exceeds the limit of {settings.batch_max_size}"
+        )
+
+
+def batch_item(result: bytes | BaseException) -> dict:
+    if isinstance(result, BaseException):
+        return {"error": str(result) or result.__class__.__name__}
+    # Ответ уже сериализован, вставляется в JSON без повторного кодирования
+    return {"result": msgspec.Raw(result)}
+
+
+@post("/msg/batch", status_code=200)
+async def get_codes_by_messages(
+    data: list[str],
+    dataset: CodesDataset,
+    lookup_limiter: AdmissionLimiter,
+) -> list[dict] | Response[dict]:
+    check_batch_size(len(data))
+
+    # Пакет занимает одно место, как и одиночный запрос: поиск идёт одним соединением
+    try:
+        async with lookup_limiter.admit():
+            results = await dataset.get_batch_data(data)
+    except OverloadedError as e:
+        return overloaded_response(e)
+
+    return [batch_item(result) for result in results]
+
+
+@post("/geo/batch", status_code=200)
+async def get_codes_by_geo_batch(
+    data: list[Point],
+    dadata: DadataClient,
+    dataset: CodesDataset,
+    lookup_limiter: AdmissionLimiter,
+    geo_limiter: AdmissionLimiter,
+) -> list[dict] | Response[dict]:
+    check_batch_size(len(data))
+
+    semaphore = asyncio.Semaphore(settings.dadata_batch_concurrency)
+
+    # Точки, не попавшие в очередь Dadata, возвращаются с ошибкой
+    async def get_address(lat: float, lon: float) -> str | None:
+        async with semaphore:
+            return await dadata.get_address_by_geo(
+                lat=lat, lon=lon, admission=geo_limiter
+            )
+
+    points = list(dict.fromkeys((point.lat, point.lon) for point in data))
+    with timed("locate"):
+        house_by_point = {point: dataset.locate(*point) for point in points}
+
+    located = [point for point in points if house_by_point[point] is not None]
+    house_results = await asyncio.gather(
+        *(dataset.get_house_data(house_by_point[point]) for point in located),
+        return_exceptions=True,
+    )
+    house_result_by_point = dict(zip(located, house_results, strict=True))
+
+    remote = [point for point in points if house_by_point[point] is None]
+    addresses = await asyncio.gather(
+        *(get_address(lat, lon) for lat, lon in remote), return_exceptions=True
+    )
+    address_by_point = dict(zip(remote, addresses, strict=True))
+
+    messages = [address for address in addresses if isinstance(address, str)]
+    try:
+        async with lookup_limiter.admit():
+            results = await dataset.get_batch_data(messages)
+    except OverloadedError as e:
+        return overloaded_response(e)
+    result_by_address = dict(zip(messages, results, strict=True))
+
+    items = []
+    for point in data:
+        if (point.lat, point.lon) in house_result_by_point:
+            items.append(batch_item(house_result_by_point[(point.lat, point.lon)]))
+            continue
+
+        address = address_by_point[(point.lat, point.lon)]
+        if isinstance(address, BaseException):
+            items.append(batch_item(address))
+        elif address is None:
+            items.append(batch_item(EMPTY_PAYLOAD))
+        else:
+            items.append(batch_item(result_by_address[address]))
+
+    return items
+
+
+@get("/suggest")
+async def suggest_addresses(
+    q: str,
+    dataset: CodesDataset,
+    limit: int = Parameter(default=10, ge=1, le=100),
+) -> list[dict[str, str | int]]:
+    """Адреса, начинающиеся с q, по убыванию количества кодов"""
+    return dataset.suggest(q, limit)
+
+
+async def no_records() -> AsyncGenerator[dict, None]:
+    return
+    yield
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Клиент принимает gzip: он указан явно или через *, и его q больше нуля"""
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+async def hold_until_sent(
+    chunks: AsyncIterable[bytes], resources: contextlib.AsyncExitStack
+) -> AsyncGenerator[bytes, None]:
+    """Поток ответа, освобождающий resources после отправки или обрыва соединения.
+
+    Litestar освобождает зависимости до отправки потока, поэтому данные,
+    из которых он читается, удерживаются здесь. Первое пустое значение
+    забирает обработчик: запущенный генератор закрывается и тогда, когда
+    ответ так и не был отправлен.
+    """
+    async with resources:
+        yield b""
+        async for chunk in chunks:
+            yield chunk
+
+
+def check_export_token(export_token: str) -> None:
+    if not settings.export_token or export_token != settings.export_token:
+        raise PermissionDeniedException("Invalid export token")
+
+
+@get("/export")
+async def export_codes(
+    state: State,
+    city: str | None = None,
+    street: str | None = Parameter(default=None, description="Начало названия улицы"),
+    updated_since: datetime | None = None,
+    *,
+    accept_encoding: str = Parameter(header="Accept-Encoding", default=""),
+    export_token: str = Parameter(header="X-Export-Token"),
+) -> Stream | Response[dict]:
+    """Выгрузка домов в формате NDJSON, по одной записи на дом.
+
+    В таблице нет времени изменения строк, поэтому все строки считаются
+    изменёнными в момент изменения файла базы. Выгрузка читается через
+    отдельный пул соединений и не занимает соединения поиска.
+    """
+    check_export_token(export_token)
+    if updated_since is not None and updated_since.tzinfo is None:
+        updated_since = updated_since.replace(tzinfo=UTC)
+    compress = accepts_gzip(accept_encoding)
+
+    datasets: DatasetManager = state.datasets
+    async with contextlib.AsyncExitStack() as stack:
+        # Вся выгрузка читается из одной версии базы, даже если её заменят
+        dataset = await stack.enter_async_context(datasets.acquire())
+
+        records: AsyncIterable[dict]
+        if updated_since is not None and dataset.modified_at <= updated_since:
+            records = no_records()
+        else:
+            # Соединение выгрузки занято, пока поток не будет отправлен
+            try:
+                connection = await stack.enter_async_context(
+                    dataset.export_pool.acquire(
+                        timeout=settings.admission_queue_timeout or None
+                    )
+                )
+            except TimeoutError:
+                return overloaded_response(OverloadedError("Too many export requests"))
+            records = iter_houses(connection, city=city, street_prefix=street)
+
+        body = hold_until_sent(
+            ndjson_chunks(records, compress=compress), stack.pop_all()
+        )
+    await anext(body)
+
+    headers = {
+        "Last-Modified": dataset.modified_at.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    return Stream(body, media_type="application/x-ndjson", headers=headers)
 
 
 codes_router = Router(
     path="/codes",
-    route_handlers=[get_codes_by_message, get_codes_by_geo],
-    dependencies={"dadata": Provide(get_dadata_client)},
+    route_handlers=[
+        get_codes_by_message,
+        get_codes_by_geo,
+        get_codes_by_messages,
+        get_codes_by_geo_batch,
+        suggest_addresses,
+        export_codes,
+    ],
+    dependencies={
+        "dadata": Provide(get_dadata_client),
+        "dataset": Provide(get_dataset),
+        "lookup_limiter": Provide(get_lookup_limiter),
+        "geo_limiter": Provide(get_geo_limiter),
+    },
 )
+
+
+def check_admin_token(admin_token: str) -> None:
+    if not settings.admin_token or admin_token != settings.admin_token:
+        raise PermissionDeniedException("Invalid admin token")
+
+
+@post("/reload", status_code=200)
+async def reload_codes(
+    state: State,
+    admin_token: str = Parameter(header="X-Admin-Token"),
+) -> dict[str, str | bool]:
+    check_admin_token(admin_token)
+
+    datasets: DatasetManager = state.datasets
+    reloaded = await datasets.reload(force=True)
+    return {"reloaded": reloaded, "version": datasets.current.version}
+
+
+@get("/stats")
+async def cache_stats(
+    state: State,
+    admin_token: str = Parameter(header="X-Admin-Token"),
+) -> dict[str, dict]:
+    check_admin_token(admin_token)
+
+    datasets: DatasetManager = state.datasets
+    geo_cache: GeoCache | None = state.geo_cache
+    locator = datasets.current.locator
+    return {
+        "result_cache": datasets.current.cache.stats(),
+        "geo_cache": geo_cache.stats() if geo_cache is not None else {},
+        "shared_result_cache": (
+            datasets.current.shared.stats() if datasets.current.shared else {}
+        ),
+        "lookup_coalescing": datasets.current.flights.stats(),
+        "geo_coalescing": state.dadata.flights.stats(),
+        "dadata": state.dadata.stats(),
+        "house_locator": locator.stats() if locator is not None else {},
+        "admission": {
+            "lookup": state.lookup_limiter.stats(),
+            "geo": state.geo_limiter.stats(),
+        },
+    }
+
+
+admin_router = Router(path="/admin", route_handlers=[reload_codes, cache_stats])
@@ -0,0 +1,142 @@
+import re
+from dataclasses import dataclass
+
+street_types = [
+    "улица",
+    "проспект",
+    "микрорайон",
+    "переулок",
+    "жилой комплекс",
+    "бульвар",
+    "тракт",
+    "поселок",
+    "проезд",
+    "шоссе",
+    "аллея",
+    "площадь",
+    "набережная",
+    "квартал",
+    "территория",
+    "деревня",
+    "военный городок",
+    "жилой массив",
+    "тупик",
+]
+
+word_pattern = re.compile(r"[а-я0-9/]+(?:-[а-я0-9/]+)*")
+house_pattern = re.compile(r"^(\d+[а-я]?(?:/\d+[а-я]?)?)(?:к(\d+))?(?:с(\d+))?$")
+korpus_pattern = re.compile(r"^к(\d+)$")
+stroenie_pattern = re.compile(r"^с(\d+)$")
+
+
+@dataclass(frozen=True)
+class ParsedAddress:
+    city: str | None
+    street_type: str | None
+    street: str
+    house: str
+    korpus: str | None = None
+    stroenie: str | None = None
+
+    @property
+    def full_house(self) -> str:
+        """Номер дома вместе с корпусом и строением, например 4к1с1"""
+        house = self.house
+        if self.korpus:
+            house += f"к{self.korpus}"
+        if self.stroenie:
+            house += f"с{self.stroenie}"
+        return house
+
+    @property
+    def house_key(self) -> str:
+        return make_house_key(self.street, self.full_house)
+
+
+def normalize_street(street: str) -> str:
+    street = street.lower().replace("ё", "е").replace("-", "").replace(",", "")
+    return " ".join(street.split())
+
+
+def normalize_house(house: str) -> str:
+    return (
+        house.lower()
+        .replace("ё", "е")
+        .replace("строение", "с")
+        .replace("корпус", "к")
+        .replace(" ", "")
+        .replace("-", "")
+    )
+
+
+def make_house_key(street: str, house: str) -> str:
+    """Канонический ключ дома, хранится в колонке codes.house_key"""
+    return f"{normalize_street(street)}|{normalize_house(house)}"
+
+
+def _pop_street_type(words: list[str]) -> str | None:
+    text = f" {' '.join(words)} "
+    for street_type in sorted(street_types, key=len, reverse=True):
+        if f" {street_type} " in text:
+            words[:] = text.replace(f" {street_type} ", " ", 1).split()
+            return street_type
+    return None
+
+
+def parse_address(msg: str) -> ParsedAddress | None:
+    """Разбор сообщения на город, тип улицы, улицу, дом, корпус и строение.
+
+    :return: None, если в сообщении не удалось выделить улицу и дом
+    """
+    text = msg.lower().replace("ё", "е")
+    text = re.sub(r"корпус\s*(\d+)", r" к\1", text)
+    text = re.sub(r"строение\s*(\d+)", r" с\1", text)
+
+    segments = [word_pattern.findall(segment) for segment in text.split(",")]
+    words = [
+        (segment_id, word)
+        for segment_id, segment in enumerate(segments)
+        for word in segment
+        if word != "дом"
+    ]
+
+    house_position = None
+    for position in range(len(words) - 1, -1, -1):
+        if house_pattern.match(words[position][1]):
+            house_position = position
+            break
+
+    if not house_position:
+        return None
+
+    match = house_pattern.match(words[house_position][1])
+    house, korpus, stroenie = match.groups()
+
+    for _, word in words[house_position + 1 :]:
+        if not korpus and (korpus_match := korpus_pattern.match(word)):
+            korpus = korpus_match.group(1)
+        elif not stroenie and (stroenie_match := stroenie_pattern.match(word)):
+            stroenie = stroenie_match.group(1)
+        else:
+            return None
+
+    before_house = words[:house_position]
+    city = None
+    if before_house[0][0] != before_house[-1][0]:
+        first_segment = before_house[0][0]
+        city = " ".join(word for i, word in before_house if i == first_segment)
+        before_house = [item for item in before_house if item[0] != first_segment]
+
+    street_words = [word for _, word in before_house]
+    street_type = _pop_street_type(street_words)
+    if not street_words:
+        return None
+
+    return ParsedAddress(
+        city=city,
+        street_type=street_type,
+        street=normalize_street(" ".join(street_words)),
+        house=house,
+        korpus=korpus,
+        stroenie=stroenie,
+    )
@@ -0,0 +1,98 @@
+import asyncio
+import contextlib
+import time
+from collections.abc import AsyncIterator
+
+from src.services.metrics import admission_queue_seconds, admission_requests
+
+
+class OverloadedError(Exception):
+    """Запрос отклонён: очередь ожидания заполнена или ожидание слишком долгое"""
+
+
+class AdmissionLimiter:
+    """Ограничение одновременных запросов воркера с очередью ожидания.
+
+    Запрос, которому не хватило места в очереди или который ждал дольше
+    queue_timeout, отклоняется сразу, а не увеличивает задержку остальных.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        queue_size: int,
+        queue_timeout: float,
+    ):
+        """:param name: Имя в метриках
+        :param limit: Количество одновременных запросов, 0 - без ограничения
+        :param queue_size: Количество ожидающих запросов
+        :param queue_timeout: Максимальное ожидание в очереди в секундах
+        """
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(limit) if limit > 0 else None
+
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+
+        self.counters = {
+            result: admission_requests.labels(name, result)
+            for result in ("admitted", "queued", "shed_queue_full", "shed_timeout")
+        }
+        self.queue_seconds = admission_queue_seconds.labels(name)
+
+    @contextlib.asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """:raise OverloadedError: Если запрос не дождался своей очереди"""
+        if self.semaphore is None:
+            yield
+            return
+
+        if self.semaphore.locked():
+            await self._wait()
+        else:
+            await self.semaphore.acquire()
+
+        self.admitted += 1
+        self.counters["admitted"].inc()
+        try:
+            yield
+        finally:
+            self.semaphore.release()
+
+    async def _wait(self) -> None:
+        if self.waiting >= self.queue_size:
+            self._shed("shed_queue_full")
+            raise OverloadedError(f"Too many {self.name} requests")
+
+        self.waiting += 1
+        self.queued += 1
+        self.counters["queued"].inc()
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.queue_timeout or None):
+                await self.semaphore.acquire()
+        except TimeoutError as e:
+            self._shed("shed_timeout")
+            raise OverloadedError(f"{self.name.capitalize()} queue timed out") from e
+        finally:
+            self.waiting -= 1
+            self.queue_seconds.observe(time.perf_counter() - started)
+
+    def _shed(self, result: str) -> None:
+        self.shed += 1
+        self.counters[result].inc()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "limit": self.limit,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": self.shed,
+        }
@@ -0,0 +1,108 @@
+import time
+import typing as tp
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+
+def approximate_size(value: tp.Any) -> int:
+    """Примерный размер значения в байтах (строки, байты, числа, словари и списки)"""
+    if isinstance(value, str):
+        return 49 + len(value.encode())
+    if isinstance(value, bytes):
+        return 33 + len(value)
+    if isinstance(value, dict):
+        return 64 + sum(
+            approximate_size(k) + approximate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, list | tuple):
+        return 56 + sum(approximate_size(item) for item in value)
+    return 32
+
+
+class LRUCache:
+    """Кэш с вытеснением давно не использованных записей и временем жизни.
+
+    Ограничен количеством записей и суммарным примерным размером значений.
+    Сбрасывается целиком при смене версии данных.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        ttl: float,
+        sizeof: Callable[[tp.Any], int] = approximate_size,
+    ):
+        """:param max_entries: Максимальное количество записей
+        :param max_bytes: Максимальный суммарный размер значений
+        :param ttl: Время жизни записи в секундах
+        :param sizeof: Функция оценки размера значения
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+
+        self._data: OrderedDict[Hashable, tuple[float, int, tp.Any]] = OrderedDict()
+        self.size_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        """Количество записей в кэше"""
+        return len(self._data)
+
+    def get(self, key: Hashable, default: tp.Any = None) -> tp.Any:
+        item = self._data.get(key)
+
+        if item is None:
+            self.misses += 1
+            return default
+
+        expires_at, size, value = item
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: tp.Any) -> None:
+        if self.max_entries <= 0:
+            return
+
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+
+        if key in self._data:
+            self._remove(key)
+
+        self._data[key] = (time.monotonic() + self.ttl, size, value)
+        self.size_bytes += size
+
+        while len(self._data) > self.max_entries or self.size_bytes > self.max_bytes:
+            oldest_key = next(iter(self._data))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._data.pop(key)
+        self.size_bytes -= size
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -1,54 +1,55 @@
+import contextlib
+import json
 import logging
 import re
+import time
 import traceback
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass
 
 import aiosqlite
 
 from src.api.config import settings
+from src.services.address_parser import ParsedAddress, parse_address, street_types
+from src.services.admission import AdmissionLimiter
+from src.services.cache import LRUCache
+from src.services.fuzzy import StreetMatcher
+from src.services.index import CandidateIndex
+from src.services.metrics import (
+    count_cache,
+    observe_stage,
+    rows_matched,
+    rows_scanned,
+    timed,
+)
+from src.services.migrations import FTS_TABLE
+from src.services.normalizer import (
+    normalize_message,
+    row_city,
+    row_house,
+    row_street_words,
+)
+from src.services.payloads import EMPTY_PAYLOAD, PayloadSource, encode_rows
+from src.services.shared_cache import SharedResultCache
+from src.services.singleflight import SingleFlight
+from src.services.snapshot import CodesSnapshot
+from src.storages.sqlite import SQLitePool
 
 logger = logging.getLogger(__name__)
 
-street_types = [
-    "улица",
-    "проспект",
-    "микрорайон",
-    "переулок",
-    "жилой комплекс",
-    "бульвар",
-    "тракт",
-    "поселок",
-    "проезд",
-    "шоссе",
-    "аллея",
-    "площадь",
-    "набережная",
-    "квартал",
-    "территория",
-    "деревня",
-    "военный городок",
-    "жилой массив",
-    "тупик",
-]
+codes_columns = "id, city, street_type, street, house, entrance, code_type, code"
 
 
-def address_exists(
+def address_matches(
     msg: str, city: str, street: str, house: str, street_type: str
 ) -> bool:
-    msg = (
-        msg.lower()
-        .replace("ё", "е")
-        .replace(",", "")
-        .replace(" дом ", " ")
-        .replace("строение", "с")
-        .replace("корпус", "к")
-        .replace(" ", "")
-        .replace("-", "")
-    )
+    """Проверка адреса из базы по уже нормализованному сообщению
 
-    city = re.sub(r"\W", "", city).lower()
-    street = street.lower().replace(",", "").replace("-", "").replace("  ", " ")
-    street_split = street.split()
-    house = house.lower()
+    :param msg: Результат normalize_message
+    """
+    city = row_city(city)
+    street_split = row_street_words(street)
+    house = row_house(house)
 
     if all(word in msg for word in street_split):
         for word in street_split:
@@ -76,15 +77,106 @@ def address_exists(
     return res
 
 
+def address_exists(
+    msg: str, city: str, street: str, house: str, street_type: str
+) -> bool:
+    return address_matches(normalize_message(msg), city, street, house, street_type)
+
+
 def street_or_city_exists(word: str, city: str, street: str) -> bool:
     return word in city.lower() or word in street.lower()
 
 
-async def get_data_from_db(msg: str) -> dict:
-    result: dict = {}
+def create_result_cache() -> LRUCache:
+    return LRUCache(
+        max_entries=settings.result_cache_max_entries,
+        max_bytes=settings.result_cache_max_bytes,
+        ttl=settings.result_cache_ttl,
+    )
+
+
+async def setup_connection(connection: aiosqlite.Connection) -> None:
+    """Регистрация UDF, используемых в запросах к codes"""
+    await connection.create_function(
+        "street_or_city_exists", 3, street_or_city_exists, deterministic=True
+    )
+    await connection.create_function("casefold", 1, str.casefold, deterministic=True)
+
+
+def create_db_pool(size: int | None = None) -> SQLitePool:
+    """:param size: Количество соединений, по умолчанию DB_POOL_SIZE"""
+    return SQLitePool(
+        db_name=settings.db_name,
+        size=settings.db_pool_size if size is None else size,
+        mmap_size=settings.db_mmap_size,
+        cache_size=settings.db_cache_size,
+        on_connect=setup_connection,
+    )
+
+
+@contextlib.asynccontextmanager
+async def db_connection(
+    pool: SQLitePool | None = None,
+) -> AsyncGenerator[aiosqlite.Connection, None]:
+    """Соединение из пула, либо отдельное соединение, если пул не передан"""
+    started = time.perf_counter()
+
+    if pool is not None:
+        async with pool.acquire() as connection:
+            observe_stage("db_acquire", time.perf_counter() - started)
+            yield connection
+        return
+
+    async with aiosqlite.connect(settings.db_name) as connection:
+        connection.row_factory = aiosqlite.Row
+        await setup_connection(connection)
+        observe_stage("db_acquire", time.perf_counter() - started)
+        yield connection
+
+
+async def select_by_house_key(
+    connection: aiosqlite.Connection, msg: str, address: ParsedAddress
+) -> list:
+    """Поиск дома по индексу codes.house_key
+
+    :param msg: Результат normalize_message
+    """
+    query = f"SELECT {codes_columns} FROM codes WHERE house_key = ?"
+    params: tuple = (address.house_key,)
+
+    if address.street_type:
+        query += " AND street_type = ?"
+        params += (address.street_type,)
+
+    data = []
+    async with connection.execute(query + " ORDER BY id", params) as cursor:
+        async for row in cursor:
+            if address_matches(msg, row[1], row[3], row[4], row[2]):
+                data.append(row)
+
+    return data
+
 
+@dataclass(frozen=True)
+class PreparedQuery:
+    """Сообщение, разобранное один раз перед поиском"""
+
+    msg: str
+    longest_word: str
+    normalized: str
+    address: ParsedAddress | None
+
+    @property
+    def cache_key(self) -> tuple:
+        # Результат зависит только от этих значений, поэтому разные написания
+        # одного адреса попадают в одну запись кэша
+        return self.longest_word, self.normalized, self.address
+
+
+def prepare_query(msg: str) -> PreparedQuery | None:
+    """:return: None, если по сообщению заведомо ничего не найти"""
     if not msg:
-        return result
+        return None
 
     msg_array = re.split(r"[^а-я]", msg)
 
@@ -93,64 +185,335 @@ async def get_data_from_db(msg: str) -> dict:
             msg_array.remove(street_type)
 
     if not msg_array:
-        return result
+        return None
 
-    longest_word = max(msg_array, key=len).lower()
+    return PreparedQuery(
+        msg=msg,
+        longest_word=max(msg_array, key=len).lower(),
+        normalized=normalize_message(msg),
+        address=parse_address(msg) if settings.house_key_lookup else None,
+    )
 
-    try:
-        async with aiosqlite.connect(settings.db_name) as connection:
-            await connection.create_function(
-                "street_or_city_exists", 3, street_or_city_exists
-            )
 
+def candidates_query(longest_word: str) -> tuple[str, tuple]:
+    """Запрос строк-кандидатов, в городе или улице которых есть longest_word"""
+    if settings.search_backend == "fts" and len(longest_word) >= 3:
+        query = f"""
+            SELECT {codes_columns}
+            FROM codes
+            WHERE id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?)
+            ORDER BY id
+        """
+        return query, (f'"{longest_word}"',)
+
+    query = f"""
+        SELECT {codes_columns}
+        FROM codes
+        WHERE street_or_city_exists(?, city, street)
+    """
+    return query, (longest_word,)
+
+
+async def select_indexed_candidates(
+    connection: aiosqlite.Connection, words: list[str], index: CandidateIndex
+) -> list[list]:
+    """Строки-кандидаты для нескольких слов за один проход.
+
+    Снимок CodesSnapshot сам отдаёт строки, для остальных индексов строки
+    выбираются из базы одним запросом.
+    """
+    row_ids = [index.candidates(word) for word in words]
+
+    all_ids = None
+    if all(ids is not None for ids in row_ids):
+        all_ids = sorted(set().union(*row_ids))
+        if not all_ids:
+            return [[] for _ in words]
+
+    if isinstance(index, CodesSnapshot):
+        rows = {row[0]: row for row in index.rows(all_ids)}
+    else:
+        params: tuple
+        if all_ids is None:
+            query, params = f"SELECT {codes_columns} FROM codes ORDER BY id", ()
+        else:
             query = f"""
-                SELECT *
+                SELECT {codes_columns}
                 FROM codes
-                WHERE street_or_city_exists('{longest_word}', city, street)
+                WHERE id IN (SELECT value FROM json_each(?))
+                ORDER BY id
             """
+            params = (json.dumps(all_ids),)
+
+        async with connection.execute(query, params) as cursor:
+            rows = {row[0]: row async for row in cursor}
+
+    return [
+        list(rows.values()) if ids is None else [rows[i] for i in ids if i in rows]
+        for ids in row_ids
+    ]
+
+
+async def select_rows(
+    connection: aiosqlite.Connection,
+    queries: list[PreparedQuery],
+    index: CandidateIndex | None = None,
+) -> list[list]:
+    """Строки, подходящие под каждый из запросов"""
+    data: list[list] = [[] for _ in queries]
+
+    for i, query in enumerate(queries):
+        if query.address is not None:
+            with timed("house_key"):
+                data[i] = await select_by_house_key(
+                    connection, query.normalized, query.address
+                )
+
+    pending = [i for i, rows in enumerate(data) if not rows]
+    if not pending:
+        return data
+
+    with timed("candidates"):
+        if index is not None:
+            candidates = await select_indexed_candidates(
+                connection, [queries[i].longest_word for i in pending], index
+            )
+        else:
+            candidates = []
+            for i in pending:
+                sql, params = candidates_query(queries[i].longest_word)
+                async with connection.execute(sql, params) as cursor:
+                    candidates.append(await cursor.fetchall())
+
+    with timed("match"):
+        for i, rows in zip(pending, candidates, strict=True):
+            msg = queries[i].normalized
+            data[i] = [
+                row
+                for row in rows
+                if address_matches(msg, row[1], row[3], row[4], row[2])
+            ]
+            rows_scanned.observe(len(rows))
+            rows_matched.observe(len(data[i]))
+
+    return data
+
 
-            data = []
-            connection.row_factory = aiosqlite.Row
-
-            async with connection.execute(query) as cursor:
-                async for row in cursor:
-                    if address_exists(
-                        msg,
-                        row["city"],
-                        row["street"],
-                        row["house"],
-                        row["street_type"],
-                    ):
-                        data.append(row)
-
-            if data:
-                shortest_city = data[0][1]
-                for _id, city, *_ in data:
-                    if len(city) < len(shortest_city):
-                        shortest_city = city
-
-                for (
-                    _id,
-                    city,
-                    street_type,
-                    street,
-                    house,
-                    entrance,
-                    code_type,
-                    code,
-                ) in data:
-                    if shortest_city in city:
-                        result.setdefault(
-                            "address",
-                            f"{shortest_city}, {street_type} {street}, дом {house}",
-                        )
-                        result.setdefault("data", {})
-                        result["data"].setdefault(entrance, []).append(
-                            (code, code_type)
-                        )
+async def get_data_from_db(
+    msg: str,
+    index: CandidateIndex | None = None,
+    pool: SQLitePool | None = None,
+    cache: LRUCache | None = None,
+    streets: StreetMatcher | None = None,
+    payloads: PayloadSource | None = None,
+    *,
+    flights: SingleFlight | None = None,
+    shared: SharedResultCache | None = None,
+    admission: AdmissionLimiter | None = None,
+) -> bytes:
+    """:param streets: Если передан, при пустом результате исправляются опечатки в улице
+    :param payloads: Заранее сериализованные ответы по домам
+    :param flights: Объединение одновременных одинаковых запросов
+    :param shared: Общий для воркеров кэш, проверяется после кэша воркера
+    :param admission: Ограничение одновременных запросов к базе, ответы из кэшей
+    его не занимают
+    :return: Ответ API в JSON
+    """
+    query = prepare_query(msg)
+    if query is None:
+        return EMPTY_PAYLOAD
 
+    if cache is not None:
+        cached = cache.get(query.cache_key)
+        count_cache("result", cached is not None)
+        if cached is not None:
+            return cached
+
+    async def lookup() -> bytes:
+        if shared is not None:
+            result = await shared.get(query.cache_key)
+            if result is not None:
+                if cache is not None:
+                    cache.set(query.cache_key, result)
+                return result
+
+        admitted = admission.admit() if admission else contextlib.nullcontext()
+        async with admitted:
+            started = time.perf_counter()
+            result = await lookup_query(
+                query,
+                index=index,
+                pool=pool,
+                cache=cache,
+                streets=streets,
+                payloads=payloads,
+            )
+        if shared is not None:
+            await shared.set(
+                query.cache_key, result, delta=time.perf_counter() - started
+            )
         return result
 
+    if flights is not None:
+        return await flights.do(query.cache_key, lookup)
+
+    return await lookup()
+
+
+async def lookup_query(
+    query: PreparedQuery,
+    index: CandidateIndex | None = None,
+    pool: SQLitePool | None = None,
+    cache: LRUCache | None = None,
+    streets: StreetMatcher | None = None,
+    payloads: PayloadSource | None = None,
+) -> bytes:
+    """Поиск по базе без проверки кэша, результат сохраняется в кэш"""
+    try:
+        async with db_connection(pool) as connection:
+            (data,) = await select_rows(connection, [query], index)
+
+    except Exception:
+        logger.error(f"Database error: {traceback.format_exc()}")
+        raise
+
+    with timed("encode"):
+        result = encode_rows(data, payloads)
+
+    if result == EMPTY_PAYLOAD and streets is not None:
+        with timed("fuzzy"):
+            corrected = correct_street(query.msg, streets)
+        if corrected is not None:
+            result = await get_data_from_db(
+                corrected, index=index, pool=pool, cache=cache, payloads=payloads
+            )
+
+    if cache is not None:
+        cache.set(query.cache_key, result)
+
+    return result
+
+
+async def get_house_data_from_db(
+    house: tuple,
+    pool: SQLitePool | None = None,
+    payloads: PayloadSource | None = None,
+) -> bytes:
+    """Ответ API для известного дома, например найденного по координатам
+
+    :param house: id любой строки дома, город, тип улицы, улица и дом
+    """
+    if payloads is not None:
+        payload = payloads.payload(house)
+        if payload is not None:
+            return payload
+
+    try:
+        async with db_connection(pool) as connection:
+            data = await connection.execute_fetchall(
+                f"SELECT {codes_columns} FROM codes "
+                "WHERE city = ? AND street_type = ? AND street = ? AND house = ?",
+                house[1:],
+            )
+
     except Exception:
         logger.error(f"Database error: {traceback.format_exc()}")
         raise
+
+    return encode_rows(list(data))
+
+
+def correct_street(msg: str, streets: StreetMatcher) -> str | None:
+    if settings.fuzzy_max_distance <= 0:
+        return None
+
+    return streets.correct(
+        msg,
+        max_distance=settings.fuzzy_max_distance,
+        time_budget=settings.fuzzy_time_budget_ms / 1000,
+    )
+
+
+async def get_batch_data_from_db(
+    messages: list[str],
+    index: CandidateIndex | None = None,
+    pool: SQLitePool | None = None,
+    cache: LRUCache | None = None,
+    streets: StreetMatcher | None = None,
+    payloads: PayloadSource | None = None,
+) -> list[bytes | Exception]:
+    """Поиск по нескольким сообщениям: одинаковые запросы выполняются один раз,
+    кандидаты всех запросов выбираются за один проход по базе.
+
+    :return: Результаты в порядке сообщений, Exception на месте неудачных
+    """
+    results: dict[tuple, bytes | Exception] = {}
+    keys: list[tuple | None] = []
+    pending: dict[tuple, PreparedQuery] = {}
+
+    for msg in messages:
+        try:
+            query = prepare_query(msg)
+        except Exception as error:
+            logger.error(f"Failed to prepare query: {traceback.format_exc()}")
+            results[("error", msg)] = error
+            keys.append(("error", msg))
+            continue
+
+        if query is None:
+            keys.append(None)
+            continue
+
+        keys.append(query.cache_key)
+        if query.cache_key in results or query.cache_key in pending:
+            continue
+
+        cached = None
+        if cache is not None:
+            cached = cache.get(query.cache_key)
+            count_cache("result", cached is not None)
+
+        if cached is not None:
+            results[query.cache_key] = cached
+        else:
+            pending[query.cache_key] = query
+
+    if pending:
+        try:
+            async with db_connection(pool) as connection:
+                data = await select_rows(connection, list(pending.values()), index)
+
+            with timed("encode"):
+                for key, rows in zip(pending, data, strict=True):
+                    results[key] = encode_rows(rows, payloads)
+
+        except Exception as error:
+            logger.error(f"Database error: {traceback.format_exc()}")
+            for key in pending:
+                results[key] = error
+
+    if streets is not None:
+        corrections = {}
+        for key, query in pending.items():
+            if results[key] == EMPTY_PAYLOAD:
+                with timed("fuzzy"):
+                    corrected = correct_street(query.msg, streets)
+                if corrected is not None:
+                    corrections[key] = corrected
+
+        if corrections:
+            corrected_results = await get_batch_data_from_db(
+                list(corrections.values()),
+                index=index,
+                pool=pool,
+                cache=cache,
+                payloads=payloads,
+            )
+            results.update(zip(corrections, corrected_results, strict=True))
+
+    if cache is not None:
+        for key in pending:
+            if isinstance(results[key], bytes):
+                cache.set(key, results[key])
+
+    return [EMPTY_PAYLOAD if key is None else results[key] for key in keys]
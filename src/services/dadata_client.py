@@ -1,46 +1,226 @@
+import asyncio
+import contextlib
 import logging
+import time
 import traceback
 import typing as tp
+from datetime import timedelta
 
-from pyreqwest.simple.request import pyreqwest_post
+from pyreqwest.client import ClientBuilder
+
+from src.services.admission import AdmissionLimiter
+from src.services.geocache import GeoCache
+from src.services.metrics import dadata_requests, timed
+from src.services.resilience import CircuitBreaker, CircuitOpenError, LatencyWindow
+from src.services.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 
+DADATA_URL = "https://suggestions.dadata.ru/suggestions/api/4_1/rs"
+
+# Меньше замеров не дают надёжной оценки квантиля для задержки хеджирования
+HEDGE_MIN_SAMPLES = 20
+
+
+class DadataUnavailableError(Exception):
+    """Dadata не ответила вовремя, вернула ошибку или размыкатель разомкнут"""
+
+
 class DadataClient:
-    def __init__(self, token: str):
+    """Клиент Dadata с пулом постоянных соединений, создаётся один раз на воркер"""
+
+    def __init__(
+        self,
+        token: str,
+        cache: GeoCache | None = None,
+        *,
+        base_url: str = DADATA_URL,
+        pool_size: int = 10,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 5.0,
+        http2: bool = True,
+        deadline: float = 3.0,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 0.05,
+    ):
+        """:param token: Токен API Dadata
+        :param cache: Кэш адресов по координатам
+        :param pool_size: Максимальное количество одновременных запросов и
+        сохраняемых открытых соединений
+        :param connect_timeout: Таймаут установки соединения в секундах
+        :param read_timeout: Таймаут чтения ответа в секундах
+        :param http2: Использовать HTTP/2, если сервер его поддерживает
+        :param deadline: Общее время на один вызов geolocate, включая
+        хеджированный запрос, 0 - без ограничения
+        :param breaker_failures: Количество ошибок подряд, после которого вызовы
+        отклоняются без запроса, 0 - не отклонять
+        :param breaker_reset: Время до пробного запроса после размыкания
+        :param hedge: Отправлять повторный запрос, если ответа нет дольше
+        квантиля hedge_quantile длительности последних запросов
+        :param hedge_min_delay: Минимальная задержка повторного запроса
+        """
         self.token = token
-        self.base_url = "https://suggestions.dadata.ru/suggestions/api/4_1/rs"
+        self.cache = cache
+        self.base_url = base_url
         self.headers = {
             "Authorization": f"Token {self.token}",
             "Content-Type": "application/json",
         }
 
-    async def geolocate(self, lat: float, lon: float) -> dict[str, tp.Any] | None:
-        url = f"{self.base_url}/geolocate/address"
-        payload = {"lat": lat, "lon": lon}
+        self.client = (
+            ClientBuilder()
+            .default_headers(self.headers)
+            .max_connections(pool_size)
+            .pool_max_idle_per_host(pool_size)
+            .connect_timeout(timedelta(seconds=connect_timeout))
+            .read_timeout(timedelta(seconds=read_timeout))
+            .http2(http2)
+            .build()
+        )
+        self.flights = SingleFlight()
+
+        self.deadline = deadline
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.latencies = LatencyWindow()
 
+        self.timeouts = 0
+        self.hedged = 0
+
+    async def geolocate(self, lat: float, lon: float) -> dict[str, tp.Any]:
+        """:return: Ответ Dadata
+        :raise DadataUnavailableError: Если ответа нет до дедлайна, Dadata
+        вернула ошибку, запрос не удался или размыкатель разомкнут
+        """
         try:
-            response = (
-                await pyreqwest_post(url)
-                .headers(self.headers)
-                .body_json(payload)
-                .send()
-            )
-
-            if response.status == 200:
-                return await response.json()
-            else:
-                logger.error(f"Dadata API error: {response.status}")
-                return None
-
-        except Exception:
-            logger.error(f"Dadata request failed: {traceback.format_exc()}")
+            self.breaker.check()
+            with timed("dadata"):
+                houses = await asyncio.wait_for(
+                    self._hedged_request(lat, lon), self.deadline or None
+                )
+
+        except CircuitOpenError as e:
+            dadata_requests.labels("rejected").inc()
+            raise DadataUnavailableError("Dadata circuit breaker is open") from e
+
+        except TimeoutError as e:
+            dadata_requests.labels("timeout").inc()
+            self.timeouts += 1
+            self.breaker.record_failure()
+            logger.error(f"Dadata request timed out after {self.deadline}s")
+            raise DadataUnavailableError("Dadata request timed out") from e
+
+        except DadataUnavailableError as e:
+            dadata_requests.labels("error").inc()
+            self.breaker.record_failure()
+            logger.error(str(e))
             raise
 
-    async def get_address_by_geo(self, lat: float, lon: float) -> str | None:
-        houses = await self.geolocate(lat=lat, lon=lon)
+        except Exception as e:
+            dadata_requests.labels("failed").inc()
+            self.breaker.record_failure()
+            logger.error(f"Dadata request failed: {traceback.format_exc()}")
+            raise DadataUnavailableError("Dadata request failed") from e
+
+        dadata_requests.labels("ok").inc()
+        self.breaker.record_success()
+        return houses
+
+    def hedge_delay(self) -> float | None:
+        """Задержка повторного запроса, None - не повторять"""
+        if not self.hedge or len(self.latencies.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        quantile = self.latencies.quantile(self.hedge_quantile)
+        if quantile is None:
+            return None
+        return max(self.hedge_min_delay, quantile)
 
+    async def _hedged_request(self, lat: float, lon: float) -> dict[str, tp.Any]:
+        """Запрос в Dadata и, если он дольше hedge_delay, ещё один такой же.
+
+        Возвращается первый успешный ответ, оставшийся запрос отменяется.
+        Ошибка одного из запросов возвращается, только если второй тоже
+        не удался.
+        """
+        tasks = {asyncio.ensure_future(self._request(lat, lon))}
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self.hedged += 1
+                    tasks.add(asyncio.ensure_future(self._request(lat, lon)))
+
+            while True:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    return succeeded[0].result()
+                if not tasks:
+                    return done.pop().result()
+
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _request(self, lat: float, lon: float) -> dict[str, tp.Any]:
+        """:raise DadataUnavailableError: Если Dadata ответила не 200"""
+        url = f"{self.base_url}/geolocate/address"
+        payload = {"lat": lat, "lon": lon}
+
+        started = time.perf_counter()
+        response = await self.client.post(url).body_json(payload).build().send()
+
+        if response.status != 200:
+            raise DadataUnavailableError(f"Dadata API error: {response.status}")
+
+        houses = await response.json()
+        self.latencies.add(time.perf_counter() - started)
+        return houses
+
+    async def get_address_by_geo(
+        self, lat: float, lon: float, admission: AdmissionLimiter | None = None
+    ) -> str | None:
+        """:param admission: Ограничение одновременных запросов в Dadata, ответы
+        из кэша его не занимают
+        """
+        if self.cache is not None:
+            with timed("geo_cache"):
+                cached = await self.cache.get(lat=lat, lon=lon)
+            if cached is not None:
+                return cached or None
+
+        # Одновременные запросы одной точки (одной ячейки кэша) отправляются
+        # в Dadata один раз
+        key = self.cache.key(lat, lon) if self.cache is not None else (lat, lon)
+        return await self.flights.do(
+            key, lambda: self.find_address(lat, lon, admission=admission)
+        )
+
+    async def find_address(
+        self, lat: float, lon: float, admission: AdmissionLimiter | None = None
+    ) -> str | None:
+        admitted = admission.admit() if admission else contextlib.nullcontext()
+        async with admitted:
+            houses = await self.geolocate(lat=lat, lon=lon)
+        address = self.address_from_suggestions(houses)
+
+        # Ошибки Dadata не кэшируются: geolocate их не возвращает, а выбрасывает
+        if self.cache is not None:
+            await self.cache.set(lat=lat, lon=lon, address=address)
+
+        return address
+
+    @staticmethod
+    def address_from_suggestions(houses: dict[str, tp.Any] | None) -> str | None:
         if houses and "suggestions" in houses and houses["suggestions"]:
             house_data: dict[str, str] = houses["suggestions"][0]["data"]
 
@@ -58,5 +238,14 @@ class DadataClient:
 
         return None
 
+    def stats(self) -> dict[str, tp.Any]:
+        p95 = self.latencies.quantile(0.95)
+        return {
+            "breaker": self.breaker.stats(),
+            "timeouts": self.timeouts,
+            "hedged": self.hedged,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
     async def close(self) -> None:
-        pass
+        await self.client.close()
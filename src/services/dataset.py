@@ -0,0 +1,397 @@
+import asyncio
+import contextlib
+import logging
+import os
+import time
+import traceback
+from collections.abc import AsyncGenerator
+from datetime import UTC, datetime
+
+import aiosqlite
+
+from src.api.config import settings
+from src.services.admission import AdmissionLimiter
+from src.services.cache import LRUCache
+from src.services.codes import (
+    create_db_pool,
+    create_result_cache,
+    get_batch_data_from_db,
+    get_data_from_db,
+    get_house_data_from_db,
+)
+from src.services.fuzzy import StreetMatcher
+from src.services.index import CandidateIndex, CodesIndex
+from src.services.locator import HouseLocator
+from src.services.migrations import FTS_TABLE, HOUSE_KEY_INDEX
+from src.services.payloads import HousePayloads, PayloadSource
+from src.services.shared_cache import SharedResultCache
+from src.services.singleflight import SingleFlight
+from src.services.snapshot import CodesSnapshot
+from src.services.suggest import AddressSuggester
+from src.storages.interfaces import KeyValueClientProtocol
+from src.storages.sqlite import SQLitePool, db_version, get_db_version
+
+logger = logging.getLogger(__name__)
+
+LOAD_ATTEMPTS = 3
+
+
+class DatabaseChangedError(Exception):
+    """Файл базы заменили во время загрузки"""
+
+
+class DatabaseSchemaError(Exception):
+    """В базе нет таблицы или индекса, которых требуют настройки"""
+
+
+async def schema_object_exists(connection: aiosqlite.Connection, name: str) -> bool:
+    """Есть ли в базе таблица или индекс с именем name"""
+    rows = await connection.execute_fetchall(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+    )
+    return bool(rows)
+
+
+async def check_schema(connection: aiosqlite.Connection) -> None:
+    """Проверка структур, которые строятся миграциями отдельно от выгрузки базы,
+    чтобы база без них не заменила текущую и не ломала каждый запрос
+
+    :raise DatabaseSchemaError: Если нужной структуры нет
+    """
+    if settings.search_backend == "fts" and not await schema_object_exists(
+        connection, FTS_TABLE
+    ):
+        raise DatabaseSchemaError(f"Table {FTS_TABLE} not found, run the fts migration")
+
+    if settings.house_key_lookup:
+        columns = await connection.execute_fetchall("PRAGMA table_info(codes)")
+        if "house_key" not in {column[1] for column in columns}:
+            raise DatabaseSchemaError(
+                "Column codes.house_key not found, run the house_key migration"
+            )
+        if not await schema_object_exists(connection, HOUSE_KEY_INDEX):
+            raise DatabaseSchemaError(
+                f"Index {HOUSE_KEY_INDEX} not found, run the house_key migration"
+            )
+
+
+class CodesDataset:
+    """Ресурсы одной версии базы: пул соединений, индекс, готовые ответы по домам
+    и кэш результатов. Выгрузка идёт через отдельный пул export_pool, чтобы
+    медленные клиенты выгрузки не занимали соединения поиска
+    """
+
+    def __init__(
+        self,
+        version: str,
+        pool: SQLitePool,
+        index: CandidateIndex | None,
+        cache: LRUCache,
+        *,
+        export_pool: SQLitePool,
+        modified_at: datetime,
+        streets: StreetMatcher | None = None,
+        payloads: PayloadSource | None = None,
+        suggester: AddressSuggester | None = None,
+        locator: HouseLocator | None = None,
+        shared: SharedResultCache | None = None,
+    ):
+        self.version = version
+        self.modified_at = modified_at
+        self.pool = pool
+        self.export_pool = export_pool
+        self.index = index
+        self.cache = cache
+        self.streets = streets
+        self.payloads = payloads
+        self.suggester = suggester
+        self.locator = locator
+        self.shared = shared
+        self.flights = SingleFlight()
+
+        self.readers = 0
+        self.retired = False
+
+    @classmethod
+    async def load(
+        cls, db_name: str, storage: KeyValueClientProtocol | None = None
+    ) -> "CodesDataset":
+        """Загрузка версии базы, повторяемая, если файл заменили во время загрузки
+
+        :param storage: Хранилище общего для воркеров кэша результатов
+        """
+        for _ in range(LOAD_ATTEMPTS - 1):
+            try:
+                return await cls._load(db_name, storage)
+            except DatabaseChangedError as e:
+                logger.warning(f"{e}, loading again")
+
+        return await cls._load(db_name, storage)
+
+    @classmethod
+    async def _load(
+        cls, db_name: str, storage: KeyValueClientProtocol | None
+    ) -> "CodesDataset":
+        """Все структуры читаются через одно соединение пула и строятся
+        в отдельных потоках, не останавливая цикл событий
+        """
+        started = time.perf_counter()
+        stat = os.stat(db_name)
+        version = db_version(stat)
+
+        pool = create_db_pool()
+        await pool.open()
+        export_pool = create_db_pool(settings.export_pool_size)
+        await export_pool.open()
+
+        index: CandidateIndex | None = None
+        streets: StreetMatcher | None = None
+        payloads: PayloadSource | None = None
+        suggester: AddressSuggester | None = None
+        locator: HouseLocator | None = None
+        try:
+            async with pool.acquire() as connection:
+                await check_schema(connection)
+
+                if settings.search_backend == "index":
+                    if settings.snapshot_path:
+                        index = await asyncio.to_thread(
+                            CodesSnapshot.attach_or_build,
+                            db_name,
+                            settings.snapshot_path,
+                        )
+                    else:
+                        index = await CodesIndex.build(connection)
+
+                if settings.fuzzy_max_distance > 0:
+                    streets = await StreetMatcher.build(connection)
+
+                if settings.precompute_payloads:
+                    if isinstance(index, CodesSnapshot):
+                        payloads = index
+                    else:
+                        payloads = await HousePayloads.build(connection)
+
+                if settings.suggest_index:
+                    suggester = await AddressSuggester.build(connection)
+
+                if settings.geo_local_max_distance > 0:
+                    locator = await HouseLocator.build(
+                        connection, settings.geo_local_max_distance
+                    )
+
+            # Снимок и соединения могли открыть уже другой файл
+            if get_db_version(db_name) != version or (
+                isinstance(index, CodesSnapshot) and index.version != version
+            ):
+                raise DatabaseChangedError(f"Database {db_name} changed while loading")
+        except Exception:
+            await pool.close()
+            await export_pool.close()
+            if isinstance(index, CodesSnapshot):
+                index.close()
+            raise
+
+        shared: SharedResultCache | None = None
+        if storage is not None and settings.shared_cache_ttl > 0:
+            shared = SharedResultCache(
+                storage,
+                version=version,
+                ttl=settings.shared_cache_ttl,
+                beta=settings.shared_cache_beta,
+            )
+
+        logger.info(
+            f"Codes dataset {version} loaded in {time.perf_counter() - started:.3f}s"
+        )
+        return cls(
+            version=version,
+            pool=pool,
+            index=index,
+            cache=create_result_cache(),
+            export_pool=export_pool,
+            modified_at=datetime.fromtimestamp(stat.st_mtime, UTC),
+            streets=streets,
+            payloads=payloads,
+            suggester=suggester,
+            locator=locator,
+            shared=shared,
+        )
+
+    async def get_data(
+        self, msg: str, admission: AdmissionLimiter | None = None
+    ) -> bytes:
+        return await get_data_from_db(
+            msg,
+            index=self.index,
+            pool=self.pool,
+            cache=self.cache,
+            streets=self.streets,
+            payloads=self.payloads,
+            flights=self.flights,
+            shared=self.shared,
+            admission=admission,
+        )
+
+    async def get_batch_data(self, messages: list[str]) -> list[bytes | Exception]:
+        return await get_batch_data_from_db(
+            messages,
+            index=self.index,
+            pool=self.pool,
+            cache=self.cache,
+            streets=self.streets,
+            payloads=self.payloads,
+        )
+
+    def suggest(self, query: str, limit: int) -> list[dict[str, str | int]]:
+        if self.suggester is None:
+            return []
+        return self.suggester.suggest(query, limit)
+
+    def locate(self, lat: float, lon: float) -> tuple | None:
+        """Ближайший дом по загруженным координатам, либо None"""
+        if self.locator is None:
+            return None
+        return self.locator.nearest(lat, lon)
+
+    async def get_house_data(self, house: tuple) -> bytes:
+        return await get_house_data_from_db(
+            house, pool=self.pool, payloads=self.payloads
+        )
+
+    async def warmup(self, queries: int) -> None:
+        """Прогрев соединений пула, страниц базы и поисковых структур запросами
+        по случайным адресам из базы, результаты не попадают в кэш
+        """
+        started = time.perf_counter()
+        async with self.pool.acquire() as connection:
+            rows = await connection.execute_fetchall(
+                "SELECT street, house FROM codes ORDER BY RANDOM() LIMIT ?",
+                (queries,),
+            )
+
+        # Соединения выдаются пулом по очереди, поэтому запросы проходят через каждое
+        for street, house in rows:
+            await get_data_from_db(
+                f"{street} {house}",
+                index=self.index,
+                pool=self.pool,
+                streets=self.streets,
+                payloads=self.payloads,
+            )
+            self.suggest(street, limit=1)
+
+        logger.info(
+            f"Codes dataset {self.version} warmed up with {len(rows)} queries "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+
+    async def close(self) -> None:
+        await self.pool.close()
+        await self.export_pool.close()
+        if isinstance(self.index, CodesSnapshot):
+            self.index.close()
+
+        logger.info(f"Codes dataset {self.version} released")
+
+
+class DatasetManager:
+    """Текущая версия данных с заменой без перезапуска API.
+
+    Новая версия полностью загружается рядом со старой и подменяет её одним
+    присваиванием, старая закрывается после завершения последнего запроса,
+    который её использует.
+    """
+
+    def __init__(self, db_name: str, storage: KeyValueClientProtocol | None = None):
+        self.db_name = db_name
+        self.storage = storage
+        self.current: CodesDataset | None = None
+        self._reload_lock = asyncio.Lock()
+        self._watch_task: asyncio.Task | None = None
+
+    async def start(self, watch_interval: float = 0) -> None:
+        self.current = await CodesDataset.load(self.db_name, self.storage)
+
+        if watch_interval > 0:
+            self._watch_task = asyncio.create_task(self._watch(watch_interval))
+
+    async def stop(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._watch_task
+
+        if self.current is not None:
+            await self._retire(self.current)
+            self.current = None
+
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncGenerator[CodesDataset, None]:
+        dataset = self.current
+        if dataset is None:
+            raise RuntimeError("Codes dataset is not loaded")
+
+        dataset.readers += 1
+        try:
+            yield dataset
+        finally:
+            dataset.readers -= 1
+            if dataset.retired and dataset.readers == 0:
+                await dataset.close()
+
+    async def reload(self, force: bool = False) -> bool:
+        """Загрузка новой версии базы
+
+        :param force: Перезагрузить, даже если версия файла не изменилась
+        :return: True, если данные были заменены
+        """
+        async with self._reload_lock:
+            version = get_db_version(self.db_name)
+            if not force and self.current and self.current.version == version:
+                return False
+
+            dataset = await CodesDataset.load(self.db_name, self.storage)
+            if settings.warmup_queries > 0:
+                try:
+                    await dataset.warmup(settings.warmup_queries)
+                except Exception:
+                    await dataset.close()
+                    raise
+
+            previous, self.current = self.current, dataset
+
+            if previous is not None:
+                await self._retire(previous)
+
+            return True
+
+    async def _retire(self, dataset: CodesDataset) -> None:
+        dataset.retired = True
+        if dataset.readers == 0:
+            await dataset.close()
+
+    async def _watch(self, interval: float) -> None:
+        """Отслеживание изменений файла базы.
+
+        Перезагрузка начинается, когда версия файла изменилась и не меняется
+        в течение одного интервала, чтобы не читать файл во время копирования.
+        """
+        pending = None
+
+        while True:
+            await asyncio.sleep(interval)
+
+            try:
+                version = get_db_version(self.db_name)
+                if self.current is None or version == self.current.version:
+                    pending = None
+                elif version != pending:
+                    pending = version
+                else:
+                    logger.info(f"Database file changed, reloading: {version}")
+                    await self.reload()
+                    pending = None
+
+            except Exception:
+                logger.error(f"Dataset reload failed: {traceback.format_exc()}")
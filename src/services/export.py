@@ -0,0 +1,96 @@
+import logging
+import zlib
+from collections.abc import AsyncGenerator, AsyncIterable
+
+import aiosqlite
+
+from src.services.codes import codes_columns
+from src.services.payloads import encoder, group_rows, house_of
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+async def iter_houses(
+    connection: aiosqlite.Connection,
+    city: str | None = None,
+    street_prefix: str | None = None,
+) -> AsyncGenerator[dict, None]:
+    """Дома таблицы codes по одному, без загрузки всей таблицы в память.
+
+    С индексом EXPORT_INDEX строки читаются в порядке индекса и первая
+    запись отдаётся сразу, без сортировки всей таблицы.
+
+    :param connection: Соединение, занятое до конца выгрузки
+    :param city: Город без учёта регистра
+    :param street_prefix: Начало названия улицы без учёта регистра
+    """
+    query = f"SELECT {codes_columns} FROM codes"
+    conditions = []
+    params: list[str | int] = []
+
+    if city:
+        conditions.append("casefold(city) = ?")
+        params.append(city.casefold())
+    if street_prefix:
+        conditions.append("substr(casefold(street), 1, ?) = ?")
+        params += [len(street_prefix), street_prefix.casefold()]
+
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY city, street, street_type, house, id"
+
+    async with connection.execute(query, params) as cursor:
+        house = None
+        rows: list = []
+        async for row in cursor:
+            if house_of(row) != house:
+                if rows:
+                    yield house_record(rows)
+                house, rows = house_of(row), []
+            rows.append(row)
+
+        if rows:
+            yield house_record(rows)
+
+
+def house_record(rows: list) -> dict:
+    city, street_type, street, house = house_of(rows[0])
+    return {
+        "city": city,
+        "street_type": street_type,
+        "street": street,
+        "house": house,
+        **group_rows(rows, city),
+    }
+
+
+async def ndjson_chunks(
+    records: AsyncIterable[dict], compress: bool = False
+) -> AsyncGenerator[bytes, None]:
+    """Записи в формате NDJSON частями примерно по CHUNK_SIZE байт
+
+    :param compress: Сжимать поток в gzip
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer = bytearray()
+    count = 0
+
+    async for record in records:
+        buffer += encoder.encode(record)
+        buffer += b"\n"
+        count += 1
+
+        if len(buffer) >= CHUNK_SIZE:
+            chunk = compressor.compress(buffer) if compressor else bytes(buffer)
+            buffer.clear()
+            if chunk:
+                yield chunk
+
+    if compressor is not None:
+        yield compressor.compress(buffer) + compressor.flush()
+    elif buffer:
+        yield bytes(buffer)
+
+    logger.info(f"Export finished: {count} houses")
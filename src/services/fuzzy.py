@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import re
+import time
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+
+import aiosqlite
+
+from src.services.address_parser import street_types
+from src.services.index import tokenize
+
+logger = logging.getLogger(__name__)
+
+word_pattern = re.compile(r"[а-я]+")
+service_words = {"дом", "корпус", "строение", *street_types}
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Расстояние Левенштейна, либо max_distance + 1, если оно больше max_distance"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+
+    return min(previous[-1], max_distance + 1)
+
+
+def padded_trigrams(word: str) -> set[str]:
+    padded = f"$${word}$$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class StreetMatcher:
+    """Исправление опечаток в названиях улиц по множеству слов из codes.street"""
+
+    def __init__(self, street_words: Iterable[str], known_words: Iterable[str] = ()):
+        """:param street_words: Слова улиц, на которые исправляются опечатки
+        :param known_words: Другие слова, которые не нужно исправлять, например города
+        """
+        self.words = sorted(set(street_words))
+        self.known_words = set(self.words) | set(known_words) | service_words
+
+        trigram_postings: dict[str, array] = {}
+        for word_id, word in enumerate(self.words):
+            for trigram in padded_trigrams(word):
+                trigram_postings.setdefault(trigram, array("I")).append(word_id)
+        self.trigram_postings = trigram_postings
+
+    @classmethod
+    def from_names(
+        cls, streets: Iterable[str], cities: Iterable[str]
+    ) -> "StreetMatcher":
+        """:param streets: Названия улиц
+        :param cities: Названия городов
+        """
+        return cls(
+            {token for street in streets for token in tokenize(street)},
+            {token for city in cities for token in tokenize(city)},
+        )
+
+    @classmethod
+    async def build(cls, connection: aiosqlite.Connection) -> "StreetMatcher":
+        started = time.perf_counter()
+
+        streets = await connection.execute_fetchall("SELECT DISTINCT street FROM codes")
+        cities = await connection.execute_fetchall("SELECT DISTINCT city FROM codes")
+
+        matcher = await asyncio.to_thread(
+            cls.from_names,
+            [street for (street,) in streets],
+            [city for (city,) in cities],
+        )
+        logger.info(
+            f"Street matcher built: {len(matcher.words)} words "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+        return matcher
+
+    def search(
+        self, word: str, max_distance: int, deadline: float | None = None
+    ) -> list[tuple[int, str]]:
+        """Слова улиц не дальше max_distance, отсортированные по расстоянию.
+
+        Каждая правка меняет не больше трёх триграмм, поэтому кандидатами
+        считаются только слова, у которых с word не меньше
+        len(trigrams) - 3 * max_distance общих триграмм.
+
+        :param deadline: Момент time.perf_counter(), после которого проверка
+        кандидатов прекращается и возвращается найденное к этому времени
+        """
+        trigrams = padded_trigrams(word)
+        threshold = len(trigrams) - 3 * max_distance
+
+        candidates: Iterable[int]
+        if threshold > 0:
+            counts: Counter[int] = Counter()
+            for trigram in trigrams:
+                counts.update(self.trigram_postings.get(trigram, ()))
+            candidates = [i for i, shared in counts.items() if shared >= threshold]
+        else:
+            # Фильтр ничего не отсекает, например для слов из повторов одной буквы
+            candidates = range(len(self.words))
+
+        found = []
+        for word_id in candidates:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+
+            candidate = self.words[word_id]
+            distance = bounded_levenshtein(word, candidate, max_distance)
+            if distance <= max_distance:
+                found.append((distance, candidate))
+
+        return sorted(found)
+
+    def correct(self, msg: str, max_distance: int, time_budget: float) -> str | None:
+        """Замена слов сообщения, которых нет среди улиц, на ближайшие из них
+
+        :param max_distance: Максимальное расстояние Левенштейна
+        :param time_budget: Ограничение времени поиска в секундах
+        :return: Исправленное сообщение в нижнем регистре, либо None
+        """
+        deadline = time.perf_counter() + time_budget
+        corrected = msg.lower()
+        changed = False
+
+        for word in set(word_pattern.findall(corrected)):
+            if len(word) < 4 or word in self.known_words:
+                continue
+
+            # Для коротких слов допускается меньше правок
+            distance = min(max_distance, len(word) // 4)
+            found = self.search(word, distance, deadline)
+
+            # Незавершённый поиск мог пропустить более близкое слово
+            if time.perf_counter() > deadline:
+                logger.warning(f"Fuzzy search for {msg!r} exceeded time budget")
+                break
+
+            if found:
+                corrected = re.sub(
+                    rf"(?<![а-я]){word}(?![а-я])", found[0][1], corrected
+                )
+                changed = True
+
+        return corrected if changed else None
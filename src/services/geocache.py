@@ -0,0 +1,123 @@
+import logging
+import traceback
+
+from src.services.cache import LRUCache
+from src.services.metrics import count_cache
+from src.storages.interfaces import KeyValueClientProtocol
+
+logger = logging.getLogger(__name__)
+
+geohash_alphabet = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Отсутствие адреса тоже кэшируется, в хранилище оно записывается пустой строкой
+NOT_FOUND = ""
+
+
+def geohash(lat: float, lon: float, precision: int) -> str:
+    """Geohash точки из precision символов, например 8 символов - ячейка
+    примерно 38 x 19 метров
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = bit_count = 0
+    is_lon = True
+
+    while len(chars) < precision:
+        value, value_range = (lon, lon_range) if is_lon else (lat, lat_range)
+        middle = (value_range[0] + value_range[1]) / 2
+        if value >= middle:
+            bits = bits * 2 + 1
+            value_range[0] = middle
+        else:
+            bits *= 2
+            value_range[1] = middle
+
+        is_lon = not is_lon
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(geohash_alphabet[bits])
+            bits = bit_count = 0
+
+    return "".join(chars)
+
+
+class GeoCache:
+    """Кэш адресов по координатам: LRU в памяти воркера и общее хранилище.
+
+    Точки из одной ячейки geohash считаются одним адресом.
+    """
+
+    def __init__(
+        self,
+        precision: int,
+        ttl: int,
+        max_entries: int,
+        storage: KeyValueClientProtocol | None = None,
+    ):
+        """:param precision: Длина geohash
+        :param ttl: Время жизни записи в секундах
+        :param max_entries: Максимальное количество записей в памяти
+        :param storage: Общее хранилище, например RedisStorage
+        """
+        self.precision = precision
+        self.ttl = ttl
+        self.storage = storage
+        # Размер ограничен количеством записей, адреса короткие
+        self.local = LRUCache(
+            max_entries=max_entries, max_bytes=max_entries * 1024, ttl=ttl
+        )
+
+        self.local_hits = 0
+        self.storage_hits = 0
+        self.misses = 0
+
+    def key(self, lat: float, lon: float) -> str:
+        return f"geo:{self.precision}:{geohash(lat, lon, self.precision)}"
+
+    async def get(self, lat: float, lon: float) -> str | None:
+        """:return: Адрес, NOT_FOUND, если адреса нет, либо None, если точки нет в кэше"""
+        key = self.key(lat, lon)
+
+        address = self.local.get(key)
+        if address is not None:
+            self.local_hits += 1
+            count_cache("geo", hit=True)
+            return address
+
+        if self.storage is not None:
+            try:
+                address = await self.storage.get(key)
+            except Exception:
+                logger.error(f"Geo cache storage error: {traceback.format_exc()}")
+
+            if address is not None:
+                self.storage_hits += 1
+                count_cache("geo", hit=True)
+                self.local.set(key, address)
+                return address
+
+        self.misses += 1
+        count_cache("geo", hit=False)
+        return None
+
+    async def set(self, lat: float, lon: float, address: str | None) -> None:
+        key = self.key(lat, lon)
+        value = NOT_FOUND if address is None else address
+        self.local.set(key, value)
+
+        if self.storage is not None:
+            try:
+                await self.storage.set(key, value, ttl=self.ttl)
+            except Exception:
+                logger.error(f"Geo cache storage error: {traceback.format_exc()}")
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.local_hits + self.storage_hits + self.misses
+        return {
+            "entries": len(self.local),
+            "local_hits": self.local_hits,
+            "storage_hits": self.storage_hits,
+            "misses": self.misses,
+            "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+        }
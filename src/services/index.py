@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import re
+import time
+import typing as tp
+from array import array
+from collections.abc import Iterable
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+token_pattern = re.compile(r"[а-я]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Разбиение строки на токены из символов а-я"""
+    return token_pattern.findall(text.lower())
+
+
+def trigrams(word: str) -> set[str]:
+    return {word[i : i + 3] for i in range(len(word) - 2)}
+
+
+@tp.runtime_checkable
+class CandidateIndex(tp.Protocol):
+    """Протокол индекса строк-кандидатов таблицы codes"""
+
+    def candidates(self, word: str) -> list[int] | None:
+        """Отсортированные id строк, у которых word входит в город или улицу.
+
+        :return: None, если подходят все строки таблицы
+        """
+        ...
+
+
+class CodesIndex:
+    """Инвертированный индекс токенов городов и улиц таблицы codes.
+
+    Искомое слово из сообщения состоит только из символов а-я, поэтому оно
+    является подстрокой города или улицы тогда и только тогда, когда оно
+    является подстрокой одного из токенов. Это позволяет получить тот же набор
+    строк, что и street_or_city_exists, не вызывая UDF для каждой строки.
+    """
+
+    def __init__(self, tokens: list[str], postings: list[array], rows_count: int):
+        self.tokens = tokens
+        self.postings = postings
+        self.rows_count = rows_count
+
+        trigram_postings: dict[str, array] = {}
+        for token_id, token in enumerate(tokens):
+            for trigram in trigrams(token):
+                trigram_postings.setdefault(trigram, array("I")).append(token_id)
+        self.trigram_postings = trigram_postings
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple[int, str, str]]) -> "CodesIndex":
+        """:param rows: Кортежи (id, city, street)"""
+        token_rows: dict[str, array] = {}
+        rows_count = 0
+
+        for row_id, city, street in rows:
+            rows_count += 1
+            for token in set(tokenize(city) + tokenize(street)):
+                token_rows.setdefault(token, array("I")).append(row_id)
+
+        tokens = sorted(token_rows)
+        postings = [array("I", sorted(token_rows[token])) for token in tokens]
+        return cls(tokens=tokens, postings=postings, rows_count=rows_count)
+
+    @classmethod
+    async def build(cls, connection: aiosqlite.Connection) -> "CodesIndex":
+        """Индекс строится в отдельном потоке, не останавливая цикл событий"""
+        started = time.perf_counter()
+
+        rows = await connection.execute_fetchall("SELECT id, city, street FROM codes")
+
+        index = await asyncio.to_thread(cls.from_rows, rows)
+        logger.info(
+            f"Codes index built: {index.rows_count} rows, {len(index.tokens)} tokens "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+        return index
+
+    def matching_tokens(self, word: str) -> list[int]:
+        """Идентификаторы токенов, содержащих word как подстроку"""
+        if len(word) < 3:
+            return [i for i, token in enumerate(self.tokens) if word in token]
+
+        candidates: array | None = None
+        for trigram in sorted(
+            trigrams(word), key=lambda t: len(self.trigram_postings.get(t, ()))
+        ):
+            token_ids = self.trigram_postings.get(trigram)
+            if not token_ids:
+                return []
+            if candidates is None:
+                candidates = token_ids
+            else:
+                current = set(token_ids)
+                candidates = array("I", (i for i in candidates if i in current))
+                if not candidates:
+                    return []
+
+        return [i for i in candidates or () if word in self.tokens[i]]
+
+    def candidates(self, word: str) -> list[int] | None:
+        """Отсортированные id строк, у которых word входит в город или улицу.
+
+        :return: None, если подходят все строки таблицы
+        """
+        if not word:
+            return None
+
+        token_ids = self.matching_tokens(word)
+        if len(token_ids) == 1:
+            return list(self.postings[token_ids[0]])
+
+        row_ids: set[int] = set()
+        for token_id in token_ids:
+            row_ids.update(self.postings[token_id])
+        return sorted(row_ids)
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import math
+import sqlite3
+import time
+from array import array
+from collections.abc import Iterable
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+COORDS_TABLE = "house_coords"
+
+EARTH_RADIUS = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+
+def distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Расстояние между точками по поверхности Земли в метрах"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class HouseLocator:
+    """Поиск ближайшего дома по координатам без обращения к Dadata.
+
+    Дома раскладываются по сетке с ячейкой max_distance по широте, поэтому
+    кандидаты находятся только в соседних ячейках вокруг точки.
+    """
+
+    def __init__(
+        self,
+        houses: Iterable[tuple[int, str, str, str, str, float, float]],
+        max_distance: float,
+    ):
+        """:param houses: id любой строки дома в codes, город, тип улицы, улица,
+        дом, широта и долгота
+        :param max_distance: Максимальное расстояние до дома в метрах
+        """
+        self.max_distance = max_distance
+        self.cell = max_distance / METERS_PER_DEGREE
+
+        self.houses: list[tuple[int, str, str, str, str]] = []
+        self.lats = array("d")
+        self.lons = array("d")
+        self.grid: dict[tuple[int, int], list[int]] = {}
+
+        for *house, lat, lon in houses:
+            house_id = len(self.houses)
+            self.houses.append(tuple(house))
+            self.lats.append(lat)
+            self.lons.append(lon)
+            self.grid.setdefault(self._cell_of(lat, lon), []).append(house_id)
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    async def build(
+        cls, connection: aiosqlite.Connection, max_distance: float
+    ) -> "HouseLocator | None":
+        """:return: None, если координаты домов не загружены"""
+        started = time.perf_counter()
+
+        try:
+            # Дома без кодов не нужны, для остальных запоминается id
+            # одной строки, по нему находится готовый ответ
+            houses = await connection.execute_fetchall(f"""
+                SELECT MIN(codes.id), city, street_type, street, house, lat, lon
+                FROM {COORDS_TABLE} JOIN codes
+                USING (city, street_type, street, house)
+                GROUP BY city, street_type, street, house
+            """)
+        except sqlite3.OperationalError:
+            logger.info(f"Table {COORDS_TABLE} not found, using Dadata only")
+            return None
+
+        locator = await asyncio.to_thread(cls, houses, max_distance)
+        logger.info(
+            f"House locator built: {len(locator.houses)} houses "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+        return locator
+
+    def _cell_of(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell), math.floor(lon / self.cell)
+
+    def nearest(self, lat: float, lon: float) -> tuple | None:
+        """:return: Ближайший дом не дальше max_distance: id строки, город, тип
+        улицы, улица и дом, либо None
+        """
+        row, column = self._cell_of(lat, lon)
+        # Градус долготы короче градуса широты, поэтому по долготе
+        # просматривается больше ячеек
+        cos_lat = math.cos(math.radians(lat))
+        columns = math.ceil(1 / max(cos_lat, 0.01))
+
+        best_id, best_distance = -1, self.max_distance
+        for i in range(row - 1, row + 2):
+            for j in range(column - columns, column + columns + 1):
+                for house_id in self.grid.get((i, j), ()):
+                    house_distance = distance(
+                        lat, lon, self.lats[house_id], self.lons[house_id]
+                    )
+                    if house_distance <= best_distance:
+                        best_id, best_distance = house_id, house_distance
+
+        if best_id < 0:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return self.houses[best_id]
+
+    def stats(self) -> dict[str, int]:
+        return {"houses": len(self.houses), "hits": self.hits, "misses": self.misses}
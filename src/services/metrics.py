@@ -0,0 +1,112 @@
+import contextlib
+import os
+import time
+from collections.abc import Iterator
+
+from prometheus_client import Counter, Gauge, Histogram, multiprocess
+
+# При нескольких воркерах granian значения пишутся в файлы каталога
+# PROMETHEUS_MULTIPROC_DIR и суммируются при чтении /metrics
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+STAGE_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+ROWS_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+stage_seconds = Histogram(
+    "domofomka_stage_duration_seconds",
+    "Duration of request processing stages",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+rows_scanned = Histogram(
+    "domofomka_rows_scanned",
+    "Candidate rows checked by address matching per query",
+    buckets=ROWS_BUCKETS,
+)
+rows_matched = Histogram(
+    "domofomka_rows_matched",
+    "Rows matching the query",
+    buckets=ROWS_BUCKETS,
+)
+cache_requests = Counter(
+    "domofomka_cache_requests",
+    "Cache lookups by cache and result",
+    ["cache", "result"],
+)
+dadata_requests = Counter(
+    "domofomka_dadata_requests",
+    "Dadata calls by outcome",
+    ["outcome"],
+)
+admission_requests = Counter(
+    "domofomka_admission_requests",
+    "Requests admitted, queued and shed by admission control",
+    ["limiter", "result"],
+)
+admission_queue_seconds = Histogram(
+    "domofomka_admission_queue_seconds",
+    "Time spent waiting in the admission queue",
+    ["limiter"],
+    buckets=STAGE_BUCKETS,
+)
+
+# Время от импорта приложения до окончания прогрева, по самому медленному воркеру
+time_to_ready = Gauge(
+    "domofomka_time_to_ready_seconds",
+    "Time from worker start until warmup is finished",
+    multiprocess_mode="max",
+)
+
+STAGES = (
+    "db_acquire",
+    "house_key",
+    "candidates",
+    "match",
+    "encode",
+    "fuzzy",
+    "locate",
+    "geo_cache",
+    "dadata",
+)
+# Дочерние метрики создаются заранее, чтобы не искать их по меткам на каждый замер
+stage_observers = {stage: stage_seconds.labels(stage) for stage in STAGES}
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    stage_observers[stage].observe(seconds)
+
+
+@contextlib.contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Замер длительности этапа в domofomka_stage_duration_seconds"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_observers[stage].observe(time.perf_counter() - started)
+
+
+def count_cache(cache: str, hit: bool) -> None:
+    cache_requests.labels(cache, "hit" if hit else "miss").inc()
+
+
+def mark_process_dead() -> None:
+    """Удаление значений остановленного воркера из общих метрик"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())  # type: ignore[no-untyped-call]
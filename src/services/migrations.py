@@ -0,0 +1,146 @@
+import argparse
+import csv
+import logging
+import sqlite3
+import time
+
+from src.services.address_parser import make_house_key
+from src.services.locator import COORDS_TABLE
+from src.services.snapshot import write_snapshot
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "codes_fts"
+HOUSE_KEY_INDEX = "codes_house_key_idx"
+EXPORT_INDEX = "codes_export_idx"
+
+
+def build_fts(db_name: str) -> None:
+    """Создание и наполнение FTS5-таблицы с trigram-токенизатором по city/street"""
+    started = time.perf_counter()
+
+    with sqlite3.connect(db_name) as connection:
+        connection.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                city,
+                street,
+                content='codes',
+                content_rowid='id',
+                tokenize='trigram'
+            )
+        """)
+        connection.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+        connection.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('optimize')")
+
+    logger.info(f"FTS table {FTS_TABLE} built in {time.perf_counter() - started:.3f}s")
+
+
+def build_house_key(db_name: str) -> None:
+    """Заполнение колонки house_key и составного индекса по ней"""
+    started = time.perf_counter()
+
+    with sqlite3.connect(db_name) as connection:
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(codes)")]
+        if "house_key" not in columns:
+            connection.execute("ALTER TABLE codes ADD COLUMN house_key TEXT")
+
+        connection.create_function(
+            "make_house_key", 2, make_house_key, deterministic=True
+        )
+        connection.execute("UPDATE codes SET house_key = make_house_key(street, house)")
+        connection.execute(f"""
+            CREATE INDEX IF NOT EXISTS {HOUSE_KEY_INDEX}
+            ON codes(house_key, street_type, city)
+        """)
+        connection.execute("ANALYZE codes")
+
+    logger.info(f"Column house_key built in {time.perf_counter() - started:.3f}s")
+
+
+def build_export_index(db_name: str) -> None:
+    """Индекс в порядке выгрузки домов: строки одного дома идут подряд"""
+    started = time.perf_counter()
+
+    with sqlite3.connect(db_name) as connection:
+        connection.execute(f"""
+            CREATE INDEX IF NOT EXISTS {EXPORT_INDEX}
+            ON codes(city, street, street_type, house)
+        """)
+
+    logger.info(f"Index {EXPORT_INDEX} built in {time.perf_counter() - started:.3f}s")
+
+
+def import_house_coords(db_name: str, csv_path: str) -> None:
+    """Загрузка координат домов из CSV с колонками city, street_type, street,
+    house, lat, lon. Координаты уже загруженных домов заменяются
+    """
+    started = time.perf_counter()
+
+    with (
+        sqlite3.connect(db_name) as connection,
+        open(csv_path, encoding="utf-8", newline="") as file,
+    ):
+        connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {COORDS_TABLE} (
+                "city" TEXT NOT NULL,
+                "street_type" TEXT NOT NULL,
+                "street" TEXT NOT NULL,
+                "house" TEXT NOT NULL,
+                "lat" REAL NOT NULL,
+                "lon" REAL NOT NULL,
+                PRIMARY KEY (city, street_type, street, house)
+            )
+        """)
+        cursor = connection.executemany(
+            f"INSERT OR REPLACE INTO {COORDS_TABLE} "
+            "VALUES (:city, :street_type, :street, :house, :lat, :lon)",
+            csv.DictReader(file),
+        )
+
+    logger.info(
+        f"Imported {cursor.rowcount} house coordinates "
+        f"in {time.perf_counter() - started:.3f}s"
+    )
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Миграции базы данных codes")
+    parser.add_argument(
+        "command", choices=["fts", "house_key", "export", "snapshot", "coords"]
+    )
+    parser.add_argument("--db-name", help="Путь к базе данных (по умолчанию DB_NAME)")
+    parser.add_argument(
+        "--snapshot-path", help="Путь к файлу снимка (по умолчанию SNAPSHOT_PATH)"
+    )
+    parser.add_argument("--csv", help="CSV с координатами домов для команды coords")
+    args = parser.parse_args()
+
+    db_name, snapshot_path = args.db_name, args.snapshot_path
+    if not db_name or (args.command == "snapshot" and not snapshot_path):
+        from src.api.config import settings
+
+        db_name = db_name or settings.db_name
+        snapshot_path = snapshot_path or settings.snapshot_path
+
+    if args.command == "fts":
+        build_fts(db_name)
+    elif args.command == "house_key":
+        build_house_key(db_name)
+    elif args.command == "export":
+        build_export_index(db_name)
+    elif args.command == "snapshot":
+        if not snapshot_path:
+            parser.error("snapshot path is not set")
+
+        write_snapshot(db_name, snapshot_path)
+    elif args.command == "coords":
+        if not args.csv:
+            parser.error("--csv is required for coords")
+
+        import_house_coords(db_name, args.csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import re
+from functools import lru_cache
+
+street_separators = str.maketrans({",": None, "-": None})
+non_word_pattern = re.compile(r"\W")
+
+
+def normalize_message(msg: str) -> str:
+    """Каноническая форма сообщения для сравнения с адресами из базы.
+
+    Цепочка replace, а не str.translate: translate с кириллицей в разы
+    медленнее, так как проходит строку посимвольно через словарь замен.
+    """
+    return (
+        msg.lower()
+        .replace("ё", "е")
+        .replace(",", "")
+        .replace(" дом ", " ")
+        .replace("строение", "с")
+        .replace("корпус", "к")
+        .replace(" ", "")
+        .replace("-", "")
+    )
+
+
+@lru_cache(maxsize=65536)
+def row_city(city: str) -> str:
+    return non_word_pattern.sub("", city).lower()
+
+
+@lru_cache(maxsize=65536)
+def row_street_words(street: str) -> tuple[str, ...]:
+    return tuple(street.lower().translate(street_separators).split())
+
+
+@lru_cache(maxsize=65536)
+def row_house(house: str) -> str:
+    return house.lower()
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+import typing as tp
+from collections.abc import Iterable, Iterator
+
+import aiosqlite
+import msgspec
+
+logger = logging.getLogger(__name__)
+
+EMPTY_PAYLOAD = b"{}"
+
+encoder = msgspec.json.Encoder()
+
+
+def house_of(row: tp.Sequence) -> tuple[str, str, str, str]:
+    """Дом строки таблицы codes: город, тип улицы, улица и номер дома"""
+    return row[1], row[2], row[3], row[4]
+
+
+def shortest_city(data: list) -> str:
+    """Самое короткое название города среди строк, например "Москва" для
+    "Москва" и "Москва, Зеленоград"
+    """
+    city = data[0][1]
+    for row in data:
+        if len(row[1]) < len(city):
+            city = row[1]
+    return city
+
+
+def group_rows(data: list, city: str | None = None) -> dict:
+    """Группировка найденных строк по подъездам для ответа API
+
+    :param city: Результат shortest_city, если уже известен
+    """
+    result: dict = {}
+
+    if data:
+        if city is None:
+            city = shortest_city(data)
+
+        for (
+            _id,
+            row_city,
+            street_type,
+            street,
+            house,
+            entrance,
+            code_type,
+            code,
+        ) in data:
+            if city in row_city:
+                result.setdefault(
+                    "address",
+                    f"{city}, {street_type} {street}, дом {house}",
+                )
+                result.setdefault("data", {})
+                result["data"].setdefault(entrance, []).append((code, code_type))
+
+    return result
+
+
+def iter_house_payloads(rows: Iterable[tp.Sequence]) -> Iterator[tuple[tuple, bytes]]:
+    """Готовые ответы API для каждого дома
+
+    :param rows: Строки таблицы codes, отсортированные по id
+    """
+    houses: dict[tuple, list] = {}
+    for row in rows:
+        houses.setdefault(house_of(row), []).append(row)
+
+    for house, house_rows in houses.items():
+        yield house, encoder.encode(group_rows(house_rows))
+
+
+@tp.runtime_checkable
+class PayloadSource(tp.Protocol):
+    def payload(self, row: tp.Sequence) -> bytes | None:
+        """Готовый ответ для дома, к которому относится строка"""
+        ...
+
+
+class HousePayloads:
+    """Заранее сериализованные ответы API по домам в памяти воркера"""
+
+    def __init__(self, payloads: dict[tuple, bytes]):
+        self.payloads = payloads
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tp.Sequence]) -> "HousePayloads":
+        return cls(dict(iter_house_payloads(rows)))
+
+    @classmethod
+    async def build(cls, connection: aiosqlite.Connection) -> "HousePayloads":
+        started = time.perf_counter()
+
+        rows = await connection.execute_fetchall(
+            "SELECT id, city, street_type, street, house, entrance, code_type, code "
+            "FROM codes ORDER BY id"
+        )
+
+        payloads = await asyncio.to_thread(cls.from_rows, rows)
+        logger.info(
+            f"House payloads built: {len(payloads.payloads)} houses "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+        return payloads
+
+    def payload(self, row: tp.Sequence) -> bytes | None:
+        return self.payloads.get(house_of(row))
+
+
+def encode_rows(data: list, payloads: PayloadSource | None = None) -> bytes:
+    """Ответ API по найденным строкам в JSON.
+
+    Все строки одного дома подходят под сообщение одновременно, поэтому если
+    после выбора самого короткого города остался один дом, ответ совпадает с
+    заранее собранным ответом для этого дома.
+    """
+    if not data:
+        return EMPTY_PAYLOAD
+
+    city = shortest_city(data)
+
+    if payloads is not None:
+        house = None
+        for row in data:
+            if city in row[1]:
+                if house is None:
+                    house, first_row = house_of(row), row
+                elif house_of(row) != house:
+                    break
+        else:
+            if house is not None and house[0] == city:
+                payload = payloads.payload(first_row)
+                if payload is not None:
+                    return payload
+
+    return encoder.encode(group_rows(data, city))
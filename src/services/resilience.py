@@ -0,0 +1,97 @@
+import math
+import time
+from collections import deque
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Размыкатель для внешнего сервиса.
+
+    После failure_threshold ошибок подряд вызовы сразу отклоняются в течение
+    reset_timeout секунд, затем пропускается один пробный вызов: при успехе
+    размыкатель замыкается, при ошибке снова размыкается.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        """:param failure_threshold: Количество ошибок подряд, 0 - не размыкать
+        :param reset_timeout: Время до пробного вызова в секундах
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial_started_at: float | None = None
+
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def check(self) -> None:
+        """:raise CircuitOpenError: Если вызов сейчас не разрешён"""
+        state = self.state
+        if state == "closed":
+            return
+
+        # Пробный вызов, который так и не завершился, не блокирует следующий
+        now = time.monotonic()
+        if state == "half_open" and (
+            self.trial_started_at is None
+            or now - self.trial_started_at >= self.reset_timeout
+        ):
+            self.trial_started_at = now
+            return
+
+        self.rejected += 1
+        raise CircuitOpenError("Circuit breaker is open")
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.opened_at is not None or (
+            self.failure_threshold > 0 and self.failures >= self.failure_threshold
+        ):
+            if self.opened_at is None:
+                self.opened += 1
+            self.opened_at = time.monotonic()
+            self.trial_started_at = None
+
+    def stats(self) -> dict[str, str | int]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyWindow:
+    """Длительности последних вызовов для оценки квантилей"""
+
+    def __init__(self, size: int = 256):
+        self.samples: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        """:return: Квантиль q, либо None, если замеров нет"""
+        if not self.samples:
+            return None
+
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
@@ -0,0 +1,93 @@
+import hashlib
+import logging
+import math
+import random
+import time
+import traceback
+from collections.abc import Hashable
+
+from src.services.metrics import count_cache
+from src.storages.interfaces import KeyValueClientProtocol
+
+logger = logging.getLogger(__name__)
+
+
+class SharedResultCache:
+    """Общий для воркеров кэш результатов поиска в хранилище ключ-значение.
+
+    Запись обновляется раньше срока с вероятностью, растущей к его концу
+    (probabilistic early expiration, XFetch): горячий ключ пересчитывает один
+    запрос, пока остальные воркеры ещё получают старое значение.
+    """
+
+    def __init__(
+        self,
+        storage: KeyValueClientProtocol,
+        version: str,
+        ttl: int,
+        beta: float = 1.0,
+    ):
+        """:param storage: Хранилище, например RedisStorage
+        :param version: Версия данных, входит в ключ
+        :param ttl: Время жизни записи в секундах
+        :param beta: Множитель раннего обновления, больше - раньше
+        """
+        self.storage = storage
+        self.version = version
+        self.ttl = ttl
+        self.beta = beta
+
+        self.hits = 0
+        self.early_refreshes = 0
+        self.misses = 0
+        self.errors = 0
+
+    def key(self, cache_key: Hashable) -> str:
+        digest = hashlib.blake2b(repr(cache_key).encode(), digest_size=16).hexdigest()
+        return f"codes:{self.version}:{digest}"
+
+    async def get(self, cache_key: Hashable) -> bytes | None:
+        """:return: Ответ, либо None, если его нет или пора обновить"""
+        try:
+            value = await self.storage.get(self.key(cache_key))
+        except Exception:
+            self.errors += 1
+            logger.error(f"Shared result cache error: {traceback.format_exc()}")
+            return None
+
+        if value is None:
+            self.misses += 1
+            count_cache("shared", hit=False)
+            return None
+
+        expires_at, delta, payload = value.split(" ", 2)
+        # 1 - random() не равно нулю, логарифм определён
+        early = float(delta) * self.beta * -math.log(1.0 - random.random())
+        if time.time() + early >= float(expires_at):
+            self.early_refreshes += 1
+            count_cache("shared", hit=False)
+            return None
+
+        self.hits += 1
+        count_cache("shared", hit=True)
+        return payload.encode()
+
+    async def set(self, cache_key: Hashable, payload: bytes, delta: float) -> None:
+        """:param delta: Время вычисления ответа в секундах"""
+        expires_at = time.time() + self.ttl
+        value = f"{expires_at:.3f} {delta:.6f} {payload.decode()}"
+        try:
+            await self.storage.set(self.key(cache_key), value, ttl=self.ttl)
+        except Exception:
+            self.errors += 1
+            logger.error(f"Shared result cache error: {traceback.format_exc()}")
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.early_refreshes + self.misses
+        return {
+            "hits": self.hits,
+            "early_refreshes": self.early_refreshes,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
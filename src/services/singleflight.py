@@ -0,0 +1,49 @@
+import asyncio
+import typing as tp
+from collections.abc import Awaitable, Callable, Hashable
+
+T = tp.TypeVar("T")
+
+
+class SingleFlight:
+    """Объединение одновременных вызовов с одинаковым ключом.
+
+    Пока вызов для ключа выполняется, остальные вызовы с тем же ключом
+    ждут его результата, а не выполняют ту же работу ещё раз. Вызов идёт
+    в отдельной задаче, поэтому отмена одного из ожидающих не отменяет
+    его для остальных.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+        # Исключение считается полученным, даже если все ожидающие отменены
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._tasks),
+        }
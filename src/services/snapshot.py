@@ -0,0 +1,290 @@
+import contextlib
+import fcntl
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import struct
+import time
+import typing as tp
+from array import array
+from bisect import bisect_left, bisect_right
+
+from src.services.index import tokenize
+from src.services.payloads import house_of, iter_house_payloads
+from src.storages.sqlite import get_db_version
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"DMFSNAP2"
+ALIGNMENT = 8
+
+string_columns = [
+    "city",
+    "street_type",
+    "street",
+    "house",
+    "entrance",
+    "code_type",
+    "code",
+]
+
+
+def _typecode(values: list[int]) -> str:
+    return "I" if not values or max(values) < 2**32 else "Q"
+
+
+def write_snapshot(db_name: str, path: str) -> None:
+    """Запись компактного снимка таблицы codes в файл.
+
+    Все строки хранятся один раз в общей таблице строк, колонки - массивы
+    номеров строк, токены городов и улиц - одним блоком, по токену на строку,
+    а списки строк по токенам - одним массивом со смещениями. Готовые ответы
+    API по домам хранятся одним блоком, для каждой строки - номер её дома.
+    """
+    started = time.perf_counter()
+
+    strings: dict[str, int] = {}
+    ids: list[int] = []
+    columns: dict[str, array] = {name: array("I") for name in string_columns}
+    token_rows: dict[str, list[int]] = {}
+
+    with sqlite3.connect(db_name) as connection:
+        rows = connection.execute(
+            f"SELECT id, {', '.join(string_columns)} FROM codes ORDER BY id"
+        ).fetchall()
+
+        for position, (row_id, *values) in enumerate(rows):
+            ids.append(row_id)
+            for name, value in zip(string_columns, values, strict=True):
+                columns[name].append(strings.setdefault(value, len(strings)))
+
+            city, street = values[0], values[2]
+            for token in set(tokenize(city) + tokenize(street)):
+                token_rows.setdefault(token, []).append(position)
+
+    strings_data = bytearray()
+    strings_offsets = array("I", [0])
+    for value in strings:
+        strings_data += value.encode()
+        strings_offsets.append(len(strings_data))
+
+    tokens = sorted(token_rows)
+    tokens_blob = bytearray()
+    tokens_offsets = array("I")
+    postings = array("I")
+    postings_offsets = array("I", [0])
+    for token in tokens:
+        tokens_offsets.append(len(tokens_blob))
+        tokens_blob += token.encode() + b"\n"
+        postings.extend(token_rows[token])
+        postings_offsets.append(len(postings))
+    tokens_offsets.append(len(tokens_blob))
+
+    house_ids: dict[tuple, int] = {}
+    payloads_data = bytearray()
+    payloads_offsets = [0]
+    for house, payload in iter_house_payloads(rows):
+        house_ids[house] = len(house_ids)
+        payloads_data += payload
+        payloads_offsets.append(len(payloads_data))
+    row_houses = array("I", (house_ids[house_of(row)] for row in rows))
+
+    sections: dict[str, bytes | bytearray | array] = {
+        "ids": array(_typecode(ids), ids),
+        "strings_data": strings_data,
+        "strings_offsets": strings_offsets,
+        "tokens_blob": tokens_blob,
+        "tokens_offsets": tokens_offsets,
+        "postings": postings,
+        "postings_offsets": postings_offsets,
+        "payloads_data": payloads_data,
+        "payloads_offsets": array(_typecode(payloads_offsets), payloads_offsets),
+        "row_houses": row_houses,
+        **{f"column_{name}": column for name, column in columns.items()},
+    }
+
+    table: dict[str, tuple[int, int, str]] = {}
+    offset = 0
+    for name, data in sections.items():
+        typecode = data.typecode if isinstance(data, array) else "B"
+        length = len(data) * (data.itemsize if isinstance(data, array) else 1)
+        table[name] = (offset, length, typecode)
+        offset += -(-length // ALIGNMENT) * ALIGNMENT
+
+    header = json.dumps(
+        {"version": get_db_version(db_name), "rows": len(ids), "sections": table}
+    ).encode()
+    data_start = -(-(len(MAGIC) + 4 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for name, data in sections.items():
+            section_offset, length, _ = table[name]
+            f.seek(data_start + section_offset)
+            f.write(data.tobytes() if isinstance(data, array) else bytes(data))
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+    logger.info(
+        f"Codes snapshot written to {path}: {len(ids)} rows, {len(strings)} strings, "
+        f"{len(tokens)} tokens, {len(house_ids)} houses "
+        f"in {time.perf_counter() - started:.3f}s"
+    )
+
+
+class CodesSnapshot:
+    """Снимок таблицы codes, отображённый в память только для чтения.
+
+    Страницы файла разделяются всеми процессами-воркерами, поэтому память
+    не растёт с их количеством. Реализует тот же поиск кандидатов, что и
+    CodesIndex, и отдаёт строки без обращения к базе.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a codes snapshot")
+
+        (header_len,) = struct.unpack_from("<I", self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(self._mmap[header_start : header_start + header_len])
+        data_start = -(-(header_start + header_len) // ALIGNMENT) * ALIGNMENT
+
+        self.version: str = header["version"]
+        self.rows_count: int = header["rows"]
+
+        self._view = memoryview(self._mmap)
+        self._sections: dict[str, memoryview] = {}
+        self._bounds: dict[str, tuple[int, int]] = {}
+        for name, (offset, length, typecode) in header["sections"].items():
+            start = data_start + offset
+            self._bounds[name] = (start, start + length)
+            self._sections[name] = self._view[start : start + length].cast(typecode)
+
+        self.ids = self._sections["ids"]
+        self._strings_data = self._sections["strings_data"]
+        self._strings_offsets = self._sections["strings_offsets"]
+        self._tokens_offsets = self._sections["tokens_offsets"]
+        self._postings = self._sections["postings"]
+        self._postings_offsets = self._sections["postings_offsets"]
+        self._columns = [self._sections[f"column_{name}"] for name in string_columns]
+        self._payloads_data = self._sections["payloads_data"]
+        self._payloads_offsets = self._sections["payloads_offsets"]
+        self._row_houses = self._sections["row_houses"]
+
+    @classmethod
+    def attach_or_build(cls, db_name: str, path: str) -> "CodesSnapshot":
+        """Подключение к снимку; если его нет или он устарел, он пересобирается.
+
+        Сборка выполняется под файловой блокировкой, поэтому при старте
+        нескольких воркеров снимок пишет только один из них.
+        """
+        started = time.perf_counter()
+
+        with open(f"{path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    snapshot = cls(path) if os.path.exists(path) else None
+                except ValueError:
+                    # Снимок в старом формате
+                    snapshot = None
+
+                if snapshot is None or snapshot.version != get_db_version(db_name):
+                    if snapshot is not None:
+                        snapshot.close()
+                    write_snapshot(db_name, path)
+                    snapshot = cls(path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        logger.info(
+            f"Codes snapshot attached: {snapshot.rows_count} rows "
+            f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return snapshot
+
+    def close(self) -> None:
+        for section in self._sections.values():
+            section.release()
+        self._sections.clear()
+        self._view.release()
+        with contextlib.suppress(BufferError):
+            self._mmap.close()
+
+    def string(self, string_id: int) -> str:
+        start = self._strings_offsets[string_id]
+        end = self._strings_offsets[string_id + 1]
+        return bytes(self._strings_data[start:end]).decode()
+
+    def matching_tokens(self, word: str) -> set[int]:
+        """Номера токенов, содержащих word как подстроку"""
+        needle = word.encode()
+        blob_start, blob_end = self._bounds["tokens_blob"]
+        offsets = self._tokens_offsets
+
+        token_ids = set()
+        position = self._mmap.find(needle, blob_start, blob_end)
+        while position != -1:
+            token_id = bisect_right(offsets, position - blob_start) - 1
+            token_ids.add(token_id)
+            position = self._mmap.find(
+                needle, blob_start + offsets[token_id + 1], blob_end
+            )
+
+        return token_ids
+
+    def candidates(self, word: str) -> list[int] | None:
+        """Отсортированные id строк, у которых word входит в город или улицу.
+
+        :return: None, если подходят все строки таблицы
+        """
+        if not word:
+            return None
+
+        positions: set[int] = set()
+        for token_id in self.matching_tokens(word):
+            start = self._postings_offsets[token_id]
+            end = self._postings_offsets[token_id + 1]
+            positions.update(self._postings[start:end])
+
+        return [self.ids[position] for position in sorted(positions)]
+
+    def payload(self, row: tp.Sequence) -> bytes | None:
+        """Готовый ответ для дома, к которому относится строка"""
+        position = bisect_left(self.ids, row[0])
+        if position == self.rows_count or self.ids[position] != row[0]:
+            return None
+
+        house_id = self._row_houses[position]
+        start = self._payloads_offsets[house_id]
+        end = self._payloads_offsets[house_id + 1]
+        return bytes(self._payloads_data[start:end])
+
+    def rows(self, ids: list[int] | None = None) -> list[tuple]:
+        """Строки таблицы codes по id в том же виде, что и SELECT
+
+        :param ids: Отсортированные id, None - все строки
+        """
+        if ids is None:
+            positions: range | list[int] = range(self.rows_count)
+        else:
+            positions = []
+            for row_id in ids:
+                position = bisect_left(self.ids, row_id)
+                if position < self.rows_count and self.ids[position] == row_id:
+                    positions.append(position)
+
+        return [
+            (self.ids[position],)
+            + tuple(self.string(column[position]) for column in self._columns)
+            for position in positions
+        ]
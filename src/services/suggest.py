@@ -0,0 +1,138 @@
+import asyncio
+import heapq
+import logging
+import re
+import time
+from array import array
+from bisect import bisect_left
+
+import aiosqlite
+
+from src.services.address_parser import street_types
+
+logger = logging.getLogger(__name__)
+
+separator_pattern = re.compile(r"[^\w]+")
+
+
+def normalize_suggest_text(text: str) -> str:
+    """Текст для сравнения префиксов: нижний регистр, е вместо ё, без знаков
+    препинания и типов улиц
+    """
+    words = separator_pattern.sub(" ", text.casefold().replace("ё", "е")).split()
+    return " ".join(word for word in words if word not in street_types)
+
+
+class AddressSuggester:
+    """Автодополнение адресов по отсортированному массиву ключей.
+
+    Для каждого дома хранятся ключи "улица дом" и "город улица дом", ключи с
+    нужным префиксом занимают непрерывный отрезок массива. Лучшие по
+    количеству кодов дома на отрезке находятся деревом отрезков без
+    просмотра всего отрезка.
+    """
+
+    def __init__(self, houses: list[tuple[str, str, str, str, int]]):
+        """:param houses: Город, тип улицы, улица, дом и количество кодов"""
+        self.addresses = [
+            f"{city}, {street_type} {street}, дом {house}"
+            for city, street_type, street, house, _ in houses
+        ]
+        self.counts = array("I", (count for *_, count in houses))
+
+        keys = sorted(
+            (normalize_suggest_text(key), house_id)
+            for house_id, (city, _, street, house, _) in enumerate(houses)
+            for key in (f"{street} {house}", f"{city} {street} {house}")
+        )
+        self.keys = [key for key, _ in keys]
+        self.key_houses = array("I", (house_id for _, house_id in keys))
+
+        # Дерево отрезков: в узле номер ключа с наибольшим количеством кодов
+        self._size = 1
+        while self._size < len(self.keys):
+            self._size *= 2
+        self._tree = array("i", [-1]) * (2 * self._size)
+        self._tree[self._size : self._size + len(self.keys)] = array(
+            "i", range(len(self.keys))
+        )
+        for node in range(self._size - 1, 0, -1):
+            self._tree[node] = self._best(
+                self._tree[2 * node], self._tree[2 * node + 1]
+            )
+
+    @classmethod
+    async def build(cls, connection: aiosqlite.Connection) -> "AddressSuggester":
+        started = time.perf_counter()
+
+        houses = await connection.execute_fetchall(
+            "SELECT city, street_type, street, house, COUNT(*) "
+            "FROM codes GROUP BY city, street_type, street, house"
+        )
+
+        suggester = await asyncio.to_thread(cls, list(houses))
+        logger.info(
+            f"Address suggester built: {len(suggester.addresses)} houses "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+        return suggester
+
+    def _weight(self, key_id: int) -> int:
+        return -1 if key_id < 0 else self.counts[self.key_houses[key_id]]
+
+    def _best(self, a: int, b: int) -> int:
+        return b if self._weight(b) > self._weight(a) else a
+
+    def _argmax(self, start: int, end: int) -> int:
+        """Ключ с наибольшим количеством кодов на отрезке [start, end)"""
+        best = -1
+        start += self._size
+        end += self._size
+        while start < end:
+            if start & 1:
+                best = self._best(best, self._tree[start])
+                start += 1
+            if end & 1:
+                end -= 1
+                best = self._best(best, self._tree[end])
+            start //= 2
+            end //= 2
+        return best
+
+    def suggest(self, query: str, limit: int = 10) -> list[dict[str, str | int]]:
+        """Адреса, начинающиеся с query, по убыванию количества кодов"""
+        prefix = normalize_suggest_text(query)
+        if not prefix:
+            return []
+
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\uffff", start)
+
+        result: list[dict[str, str | int]] = []
+        seen: set[int] = set()
+        ranges: list[tuple[int, int, int, int]] = []
+
+        def push(range_start: int, range_end: int) -> None:
+            if range_start < range_end:
+                key_id = self._argmax(range_start, range_end)
+                heapq.heappush(
+                    ranges, (-self._weight(key_id), key_id, range_start, range_end)
+                )
+
+        push(start, end)
+        while ranges and len(result) < limit:
+            _, key_id, range_start, range_end = heapq.heappop(ranges)
+            house_id = self.key_houses[key_id]
+            if house_id not in seen:
+                seen.add(house_id)
+                result.append(
+                    {
+                        "address": self.addresses[house_id],
+                        "codes": self.counts[house_id],
+                    }
+                )
+
+            push(range_start, key_id)
+            push(key_id + 1, range_end)
+
+        return result
@@ -0,0 +1,86 @@
+import asyncio
+import contextlib
+import logging
+import os
+from collections.abc import AsyncGenerator, Awaitable, Callable
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+
+def get_db_version(db_name: str) -> str:
+    """Версия файла базы данных, меняется при его замене или изменении"""
+    return db_version(os.stat(db_name))
+
+
+def db_version(stat: os.stat_result) -> str:
+    return f"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+class SQLitePool:
+    """Пул постоянных соединений SQLite только для чтения"""
+
+    def __init__(
+        self,
+        db_name: str,
+        size: int = 4,
+        mmap_size: int = 0,
+        cache_size: int = -2000,
+        on_connect: Callable[[aiosqlite.Connection], Awaitable[None]] | None = None,
+    ):
+        """:param db_name: Путь к базе данных
+        :param size: Количество соединений
+        :param mmap_size: PRAGMA mmap_size в байтах
+        :param cache_size: PRAGMA cache_size (отрицательное значение - в КиБ)
+        :param on_connect: Дополнительная настройка соединения, например регистрация UDF
+        """
+        self.db_name = db_name
+        self.size = size
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.on_connect = on_connect
+        self._connections: list[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        connection = await aiosqlite.connect(self.db_name)
+        connection.row_factory = aiosqlite.Row
+
+        await connection.execute("PRAGMA query_only = ON")
+        await connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        await connection.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+
+        if self.on_connect is not None:
+            await self.on_connect(connection)
+
+        return connection
+
+    async def open(self) -> None:
+        for _ in range(self.size):
+            connection = await self._connect()
+            self._connections.append(connection)
+            self._idle.put_nowait(connection)
+
+        logger.info(f"SQLite pool opened: {self.db_name}, {self.size} connections")
+
+    async def close(self) -> None:
+        for connection in self._connections:
+            await connection.close()
+
+        self._connections.clear()
+        self._idle = asyncio.Queue()
+
+    @contextlib.asynccontextmanager
+    async def acquire(
+        self, timeout: float | None = None
+    ) -> AsyncGenerator[aiosqlite.Connection, None]:
+        """:param timeout: Максимальное ожидание свободного соединения в секундах
+        :raise TimeoutError: Если соединение не освободилось за timeout
+        """
+        async with asyncio.timeout(timeout):
+            connection = await self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put_nowait(connection)
@@ -1,10 +1,12 @@
+import functools
 from pathlib import Path
 
 import toml
 
 
+@functools.cache
 def get_app_info() -> dict[str, str]:
-    """Получение информации о приложении из pyproject.toml"""
+    """Получение информации о приложении из pyproject.toml, файл читается один раз"""
     current_file_path = Path(__file__).resolve()
     project_root = current_file_path.parents[1]
     pyproject_path = project_root / "pyproject.toml"
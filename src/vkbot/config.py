@@ -12,6 +12,8 @@ class VKBotSettings(BaseSettings):
     redis_password: str | None = None
     cache_expire_time: int
     anti_spam_time: int
+    handler_concurrency: int = 16
+    event_queue_size: int = 1000
 
     domofomka_api_host: str
     domofomka_api_port: int
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import traceback
+from collections import deque
+from collections.abc import Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+class EventDispatcher:
+    """Параллельная обработка событий ограниченным числом задач.
+
+    События одного пользователя выполняются по порядку: пока одна задача
+    обрабатывает пользователя, его новые события ждут в её очереди, а не
+    занимают другие задачи.
+    """
+
+    def __init__(self, concurrency: int, queue_size: int):
+        """:param concurrency: Количество одновременно обрабатываемых событий
+        :param queue_size: Количество ожидающих событий, при заполнении
+        добавление ждёт освобождения места
+        """
+        self.concurrency = concurrency
+        self.queue: asyncio.Queue[tuple[Hashable, Job]] = asyncio.Queue(queue_size)
+        self.pending: dict[Hashable, deque[Job]] = {}
+        self._workers: list[asyncio.Task] = []
+
+    async def put(self, key: Hashable, job: Job) -> None:
+        """:param key: Ключ порядка, например id пользователя"""
+        await self.queue.put((key, job))
+
+    async def join(self) -> None:
+        """Ожидание выполнения всех добавленных событий"""
+        await self.queue.join()
+
+    def start(self) -> None:
+        self._workers = [
+            asyncio.create_task(self._work()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    async def _work(self) -> None:
+        while True:
+            key, job = await self.queue.get()
+
+            # Пользователя уже обрабатывает другая задача, она выполнит и это
+            # событие, и отметит его выполненным в очереди
+            jobs = self.pending.get(key)
+            if jobs is not None:
+                jobs.append(job)
+                continue
+
+            self.pending[key] = jobs = deque([job])
+            try:
+                while jobs:
+                    await self._run(jobs.popleft())
+                    self.queue.task_done()
+            finally:
+                del self.pending[key]
+
+    @staticmethod
+    async def _run(job: Job) -> None:
+        try:
+            await job()
+        except Exception:
+            logger.error(f"Error in event handler: {traceback.format_exc()}")
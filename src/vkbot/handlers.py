@@ -1,6 +1,9 @@
+import asyncio
 import json
 import logging
 import traceback
+import typing as tp
+from collections.abc import Callable
 
 from pyreqwest.simple.request import pyreqwest_get
 from vk_api.utils import get_random_id
@@ -12,13 +15,27 @@ from src.vkbot.keyboard import build_many_buttons, get_location_keyboard
 
 logger = logging.getLogger(__name__)
 
+HTTP_503_SERVICE_UNAVAILABLE = 503
+UNAVAILABLE_MESSAGE = "Сервис временно недоступен, попробуйте позже"
+
+
+class ApiUnavailableError(Exception):
+    """API перегружено или Dadata недоступна, запрос можно повторить позже"""
+
 
 class MessageHandler:
     def __init__(self, vk_api: VkApiMethod, redis: KeyValueClientProtocol):
         self.vk = vk_api
         self.redis = redis
 
-    def handle_start(self, user_id: int) -> None:
+    @staticmethod
+    async def call_vk(method: Callable[..., tp.Any], **params: tp.Any) -> tp.Any:
+        """Вызов VK API в отдельном потоке: vk_api блокирующий, а обработчики
+        событий разных пользователей выполняются параллельно
+        """
+        return await asyncio.to_thread(method, **params)
+
+    async def handle_start(self, user_id: int) -> None:
         try:
             with open("/backend/start_message.txt", encoding="utf8") as f:
                 message = f.read()
@@ -26,16 +43,18 @@ class MessageHandler:
             logger.error(f"Failed to read start message: {traceback.format_exc()}")
             raise
 
-        self.vk.messages.send(
+        await self.call_vk(
+            self.vk.messages.send,
             user_id=user_id,
             random_id=get_random_id(),
             message=message,
             keyboard=get_location_keyboard(),
         )
 
-    def check_subscription(self, user_id: int) -> bool:
+    async def check_subscription(self, user_id: int) -> bool:
         try:
-            result = self.vk.groups.isMember(
+            result = await self.call_vk(
+                self.vk.groups.isMember,
                 group_id=settings.vk_group_id,
                 user_id=user_id,
             )
@@ -52,10 +71,15 @@ class MessageHandler:
 
             if response.status == 200:
                 return await response.json()
+            elif response.status == HTTP_503_SERVICE_UNAVAILABLE:
+                raise ApiUnavailableError("API is temporarily unavailable")
             else:
                 logger.error(f"API error: {response.status}")
                 raise RuntimeError(f"API returned status {response.status}")
 
+        except ApiUnavailableError:
+            logger.warning("API is temporarily unavailable for a geo request")
+            raise
         except Exception:
             logger.error(f"Failed to get codes by geo: {traceback.format_exc()}")
             raise
@@ -68,10 +92,15 @@ class MessageHandler:
 
             if response.status == 200:
                 return await response.json()
+            elif response.status == HTTP_503_SERVICE_UNAVAILABLE:
+                raise ApiUnavailableError("API is temporarily unavailable")
             else:
                 logger.error(f"API error: {response.status}")
                 raise RuntimeError(f"API returned status {response.status}")
 
+        except ApiUnavailableError:
+            logger.warning("API is temporarily unavailable for a message request")
+            raise
         except Exception:
             logger.error(f"Failed to get codes by message: {traceback.format_exc()}")
             raise
@@ -81,11 +110,12 @@ class MessageHandler:
         text = event["message"]["text"].lower()
 
         if text == "начать":
-            self.handle_start(user_id)
+            await self.handle_start(user_id)
             return
 
-        if not self.check_subscription(user_id):
-            self.vk.messages.send(
+        if not await self.check_subscription(user_id):
+            await self.call_vk(
+                self.vk.messages.send,
                 user_id=user_id,
                 random_id=get_random_id(),
                 message="Пожалуйста, подпишитесь на группу",
@@ -94,15 +124,25 @@ class MessageHandler:
             return
 
         result = None
-        if "geo" in event["message"]:
-            coords = event["message"]["geo"]["coordinates"]
-            lat, lon = coords["latitude"], coords["longitude"]
-            result = await self.get_codes_by_geo(lat, lon)
-        else:
-            result = await self.get_codes_by_message(event["message"]["text"])
+        try:
+            if "geo" in event["message"]:
+                coords = event["message"]["geo"]["coordinates"]
+                lat, lon = coords["latitude"], coords["longitude"]
+                result = await self.get_codes_by_geo(lat, lon)
+            else:
+                result = await self.get_codes_by_message(event["message"]["text"])
+        except ApiUnavailableError:
+            await self.call_vk(
+                self.vk.messages.send,
+                user_id=user_id,
+                random_id=get_random_id(),
+                message=UNAVAILABLE_MESSAGE,
+            )
+            return
 
         if not result:
-            self.vk.messages.send(
+            await self.call_vk(
+                self.vk.messages.send,
                 user_id=user_id,
                 random_id=get_random_id(),
                 message="Нет результатов",
@@ -117,7 +157,8 @@ class MessageHandler:
             buttons = build_many_buttons(ent_slice)
 
             if not await self.redis.get(f"vk:user:{user_id}:action"):
-                msg_id = self.vk.messages.send(
+                msg_id = await self.call_vk(
+                    self.vk.messages.send,
                     user_id=user_id,
                     random_id=get_random_id(),
                     message=result["address"],
@@ -129,7 +170,9 @@ class MessageHandler:
                     ),
                 )
 
-                msg_data = self.vk.messages.getById(message_ids=msg_id)
+                msg_data = await self.call_vk(
+                    self.vk.messages.getById, message_ids=msg_id
+                )
                 conversation_message_id = msg_data["items"][0][
                     "conversation_message_id"
                 ]
@@ -159,7 +202,8 @@ class MessageHandler:
                     )
                 )
 
-                self.vk.messages.sendMessageEventAnswer(
+                await self.call_vk(
+                    self.vk.messages.sendMessageEventAnswer,
                     event_id=event["event_id"],
                     user_id=user_id,
                     peer_id=peer_id,
@@ -179,14 +223,27 @@ class MessageHandler:
         if cached:
             result = json.loads(cached)
         else:
-            msg_data = self.vk.messages.getByConversationMessageId(
+            msg_data = await self.call_vk(
+                self.vk.messages.getByConversationMessageId,
                 peer_id=peer_id,
                 conversation_message_ids=conversation_message_id,
             )
 
             address = msg_data["items"][0]["text"].split("\n")[0]
             message_text = address.replace(",", "").replace(" дом ", " ")
-            result = await self.get_codes_by_message(message_text)
+            try:
+                result = await self.get_codes_by_message(message_text)
+            except ApiUnavailableError:
+                await self.call_vk(
+                    self.vk.messages.sendMessageEventAnswer,
+                    event_id=event["event_id"],
+                    user_id=user_id,
+                    peer_id=peer_id,
+                    event_data=json.dumps(
+                        {"type": "show_snackbar", "text": UNAVAILABLE_MESSAGE}
+                    ),
+                )
+                return
 
         possible_types = ["yaeda", "delivery", "oldcodes"]
         codes = result["data"][payload["entrance"]]
@@ -201,7 +258,8 @@ class MessageHandler:
                 answer += f"\n{current_type}:\n"
             answer += code + " "
 
-        self.vk.messages.edit(
+        await self.call_vk(
+            self.vk.messages.edit,
             peer_id=peer_id,
             conversation_message_id=conversation_message_id,
             message=f"{result['address']}\nПодъезд {payload['entrance']}\n{answer}",
@@ -1,14 +1,18 @@
 import asyncio
+import functools
 import logging
+import threading
+import time
 import traceback
 
 from redis.asyncio import Redis
 from vk_api import VkApi
-from vk_api.bot_longpoll import VkBotEventType, VkBotLongPoll
+from vk_api.bot_longpoll import VkBotEvent, VkBotEventType, VkBotLongPoll
 from vk_api.vk_api import VkApiMethod
 
 from src.storages.redis import RedisStorage
 from src.vkbot.config import settings
+from src.vkbot.dispatcher import EventDispatcher
 from src.vkbot.handlers import MessageHandler
 
 logging.basicConfig(level=logging.INFO)
@@ -33,21 +37,51 @@ class VKBot:
         redis_client = Redis(host=redis_host, port=redis_port, password=redis_password)
         self.redis_storage = RedisStorage(redis_client)
         self.handler = MessageHandler(vk_api=self.vk_api, redis=self.redis_storage)
+        self.dispatcher = EventDispatcher(
+            concurrency=settings.handler_concurrency,
+            queue_size=settings.event_queue_size,
+        )
 
     async def run(self) -> None:
         logger.info("VK Bot started")
 
+        # Long poll блокирует поток, поэтому читается в отдельном потоке, а
+        # события обрабатываются в цикле событий
+        loop = asyncio.get_running_loop()
+        reader = threading.Thread(
+            target=self.read_events, args=(loop,), name="vk-long-poll", daemon=True
+        )
+        self.dispatcher.start()
+        reader.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.dispatcher.stop()
+
+    def read_events(self, loop: asyncio.AbstractEventLoop) -> None:
         while True:
             try:
                 for event in self.long_poll.listen():
-                    if event.type == VkBotEventType.MESSAGE_NEW:
-                        await self.handler.handle_message(event.obj)
-                    elif event.type == VkBotEventType.MESSAGE_EVENT:
-                        await self.handler.handle_event(event.obj)
+                    self.dispatch(event, loop)
 
             except Exception:
-                logger.error(f"Error in main loop: {traceback.format_exc()}")
-                await asyncio.sleep(3)
+                logger.error(f"Error in long poll loop: {traceback.format_exc()}")
+                time.sleep(3)
+
+    def dispatch(self, event: VkBotEvent, loop: asyncio.AbstractEventLoop) -> None:
+        """Передача события в очередь обработки, ждёт, пока в очереди нет места"""
+        if event.type == VkBotEventType.MESSAGE_NEW:
+            user_id = event.obj["message"]["from_id"]
+            job = functools.partial(self.handler.handle_message, event.obj)
+        elif event.type == VkBotEventType.MESSAGE_EVENT:
+            user_id = event.obj["user_id"]
+            job = functools.partial(self.handler.handle_event, event.obj)
+        else:
+            return
+
+        asyncio.run_coroutine_threadsafe(
+            self.dispatcher.put(user_id, job), loop
+        ).result()
 
     async def cleanup(self) -> None:
         await self.redis_storage.client.aclose()
@@ -0,0 +1,107 @@
+import os
+import sqlite3
+import threading
+from collections.abc import AsyncGenerator, Iterator
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from litestar.testing import AsyncTestClient
+
+# Настройки читаются при импорте src.api.config
+os.environ.setdefault("API_HOST", "127.0.0.1")
+os.environ.setdefault("API_PORT", "8000")
+os.environ.setdefault("DB_NAME", "codes.db")
+os.environ.setdefault("DADATA_TOKEN", "test")
+# Настройки бота читаются при импорте src.vkbot.config
+os.environ.setdefault("VK_GROUP_TOKEN", "test")
+os.environ.setdefault("VK_GROUP_ID", "1")
+os.environ.setdefault("REDIS_HOST", "127.0.0.1")
+os.environ.setdefault("REDIS_PORT", "6379")
+os.environ.setdefault("CACHE_EXPIRE_TIME", "60")
+os.environ.setdefault("ANTI_SPAM_TIME", "1")
+os.environ.setdefault("DOMOFOMKA_API_HOST", "127.0.0.1")
+os.environ.setdefault("DOMOFOMKA_API_PORT", "8000")
+
+from src.api.config import settings  # noqa: E402
+from tests.fakes import ScriptedDadata  # noqa: E402
+
+houses = [
+    ("Москва", "улица", "Трофимова", "1"),
+    ("Москва", "улица", "Трофимова", "1к2"),
+    ("Москва", "улица", "Трофимова", "12"),
+    ("Москва", "проспект", "Мира", "5"),
+    ("Москва", "улица", "Мира", "5"),
+    ("Москва", "улица", "Маршала Жукова", "7с1"),
+    ("Москва", "улица", "Молодёжная", "3"),
+    ("Санкт-Петербург", "улица", "Садовая", "10"),
+    ("Санкт-Петербург", "проспект", "Мира", "5"),
+    ("Мытищи", "улица", "Мира", "5"),
+    ("Мытищи", "переулок", "Лесной", "2а"),
+    ("Мытищи", "улица", "2-я Лесная", "2"),
+]
+
+
+@pytest.fixture
+def codes_db(tmp_path: Path, monkeypatch) -> str:
+    """Небольшая база codes: по два подъезда и два типа кодов на дом"""
+    path = str(tmp_path / "codes.db")
+    with sqlite3.connect(path) as connection:
+        connection.execute("""
+            CREATE TABLE codes (
+                "id" INTEGER PRIMARY KEY,
+                "city" TEXT NOT NULL,
+                "street_type" TEXT NOT NULL,
+                "street" TEXT NOT NULL,
+                "house" TEXT NOT NULL,
+                "entrance" TEXT NOT NULL,
+                "code_type" TEXT NOT NULL,
+                "code" TEXT NOT NULL
+            )
+        """)
+        connection.executemany(
+            "INSERT INTO codes (city, street_type, street, house, entrance, "
+            "code_type, code) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (*house, str(entrance), code_type, f"#{i}{entrance}")
+                for i, house in enumerate(houses)
+                for entrance in (1, 2)
+                for code_type in ("yaeda", "delivery")
+            ],
+        )
+    connection.close()
+
+    monkeypatch.setattr(settings, "db_name", path)
+    return path
+
+
+@pytest.fixture
+def dadata() -> Iterator[type[ScriptedDadata]]:
+    """Запущенная ScriptedDadata, адрес сервера - в dadata.url"""
+    ScriptedDadata.script = []
+    ScriptedDadata.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedDadata)
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    ScriptedDadata.url = f"http://127.0.0.1:{server.server_port}"
+    yield ScriptedDadata
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+async def client(
+    codes_db: str, dadata: type[ScriptedDadata], monkeypatch
+) -> AsyncGenerator[AsyncTestClient, None]:
+    from src.api.app import app
+
+    monkeypatch.setattr(settings, "dadata_url", dadata.url)
+    monkeypatch.setattr(settings, "dadata_http2", False)
+    monkeypatch.setattr(settings, "db_watch_interval", 0)
+    monkeypatch.setattr(settings, "warmup_queries", 0)
+    monkeypatch.setattr(settings, "geo_local_max_distance", 0)
+    async with AsyncTestClient(app) as client:
+        yield client
@@ -0,0 +1,62 @@
+import json
+import threading
+import time
+import typing as tp
+from http.server import BaseHTTPRequestHandler
+
+
+class ScriptedDadata(BaseHTTPRequestHandler):
+    """Dadata, отвечающая по очереди заданными задержкой и статусом"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    answer = {
+        "suggestions": [
+            {"data": {"city": "Москва", "street": "Трофимова", "house": "1"}}
+        ]
+    }
+    url = ""
+    script: list[tuple[float, int]] = []
+    requests = 0
+    lock = threading.Lock()
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.lock:
+            cls = type(self)
+            cls.requests += 1
+            delay, status = cls.script.pop(0) if cls.script else (0.0, 200)
+        time.sleep(delay)
+
+        data = json.dumps(self.answer if status == 200 else {}).encode()
+        self.wfile.write(
+            f"HTTP/1.1 {status} -\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class MemoryStorage:
+    """Хранилище ключ-значение в памяти с get и set KeyValueClientProtocol.
+
+    При failing каждая операция падает, как при недоступном Redis.
+    """
+
+    def __init__(self) -> None:
+        self.data: dict[str, tp.Any] = {}
+        self.ttls: dict[str, int | None] = {}
+        self.failing = False
+
+    async def get(self, key: str) -> tp.Any:
+        if self.failing:
+            raise ConnectionError("storage is unavailable")
+        return self.data.get(key)
+
+    async def set(self, key: str, value: tp.Any, ttl: int | None = None) -> None:
+        if self.failing:
+            raise ConnectionError("storage is unavailable")
+        self.data[key] = value
+        self.ttls[key] = ttl
@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from benchmarks.micro import legacy_address_exists
+from src.services.codes import address_exists, address_matches
+from src.services.normalizer import normalize_message
+
+cities = ["Москва", "Королёв", "Санкт-Петербург", "Мытищи", "Ленинск-Кузнецкий"]
+streets = [
+    "Вернадского",
+    "Трофимова",
+    "1-я Аэропортовская",
+    "Красная  Пресня",
+    "Строителей, 2-й",
+    "Ёлочная",
+]
+street_types = ["улица", "проспект", "переулок", "ул"]
+houses = ["3", "21", "105к2", "4к1с1", "12а", "1"]
+# Части сообщений, на которых отличались бы нормализации
+words = [
+    *cities,
+    *streets,
+    *street_types,
+    *houses,
+    "дом",
+    "Дом",
+    "корпус",
+    "КОРПУС",
+    "строение",
+    "к",
+    "с",
+    "ё",
+    "Ё",
+    ",",
+    "-",
+    " ",
+    "  ",
+    "мск",
+    "дома",
+    "домофон",
+    "\t",
+]
+
+
+@pytest.mark.parametrize(
+    ("msg", "row"),
+    [
+        ("трофимова 3", ("Москва", "Трофимова", "3", "улица")),
+        ("Вернадского 105 корпус 2", ("Москва", "Вернадского", "105к2", "проспект")),
+        ("Королёв, Ёлочная, дом 21", ("Королёв", "Ёлочная", "21", "улица")),
+        ("1я Аэропортовская улица 6", ("Москва", "1-я Аэропортовская", "6", "улица")),
+        (
+            "красная пресня 4 корпус 1 строение 1",
+            ("Москва", "Красная  Пресня", "4к1с1", "улица"),
+        ),
+        ("москва трофимова 33", ("Москва", "Трофимова", "3", "улица")),
+    ],
+)
+def test_matches_legacy_on_examples(msg: str, row: tuple[str, str, str, str]) -> None:
+    expected = legacy_address_exists(msg, *row)
+    assert address_matches(normalize_message(msg), *row) is expected
+    assert address_exists(msg, *row) is expected
+
+
+def random_message(rng: random.Random, row: tuple[str, str, str, str]) -> str:
+    """Сообщение из частей адреса кандидата, других адресов и служебных слов"""
+    city, street, house, street_type = row
+    house = house.replace("к", rng.choice(["к", " корпус ", " к"]))
+    house = house.replace("с", rng.choice(["с", " строение ", "с"]))
+    parts = [street, rng.choice(["", "дом ", "д "]) + house]
+    parts += rng.sample([city, street_type, *words], rng.randint(0, 2))
+    rng.shuffle(parts)
+    return rng.choice([" ", ", ", "  "]).join(parts)
+
+
+def test_matches_legacy_on_random_messages() -> None:
+    rng = random.Random(0)
+    matched = 0
+
+    for _ in range(20000):
+        row = (
+            rng.choice(cities),
+            rng.choice(streets),
+            rng.choice(houses),
+            rng.choice(street_types),
+        )
+        if rng.random() < 0.5:
+            msg = random_message(rng, row)
+        else:
+            msg = "".join(
+                rng.choice(words) + rng.choice(["", " ", ", "])
+                for _ in range(rng.randint(1, 6))
+            )
+        if rng.random() < 0.5:
+            msg = msg.upper() if rng.random() < 0.5 else msg.title()
+
+        expected = legacy_address_exists(msg, *row)
+        assert address_matches(normalize_message(msg), *row) is expected, (msg, row)
+        matched += expected
+
+    # Случайные сообщения проверяют обе ветки, а не только отказы
+    assert matched > 1000
@@ -0,0 +1,22 @@
+import pytest
+from litestar.testing import AsyncTestClient
+
+from src.api.app import app
+from src.api.config import settings
+
+
+async def test_lookup_limit_defaults_to_pool_size(client: AsyncTestClient) -> None:
+    assert settings.admission_lookup_limit is None
+    assert client.app.state.lookup_limiter.limit == settings.db_pool_size
+
+
+async def test_lookup_limit_from_settings(
+    codes_db: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "admission_lookup_limit", 2)
+    monkeypatch.setattr(settings, "db_watch_interval", 0)
+    monkeypatch.setattr(settings, "warmup_queries", 0)
+    monkeypatch.setattr(settings, "geo_local_max_distance", 0)
+
+    async with AsyncTestClient(app) as client:
+        assert client.app.state.lookup_limiter.limit == 2
@@ -0,0 +1,60 @@
+import typing as tp
+from pathlib import Path
+
+import aiosqlite
+import pytest
+
+from src.api.config import settings
+from src.services.codes import get_data_from_db
+from src.services.index import CodesIndex
+from src.services.migrations import build_fts, build_house_key
+from src.services.payloads import EMPTY_PAYLOAD
+from src.services.snapshot import CodesSnapshot
+
+messages = [
+    "трофимова 1",
+    "Трофимова 1к2",
+    "улица трофимова, дом 12",
+    "москва мира 5",
+    "проспект мира 5",
+    "мытищи, улица мира 5",
+    "санкт-петербург садовая 10",
+    "маршала жукова 7с1",
+    "лесной 2а",
+    "2-я лесная 2",
+    "мира",
+    "трофимова 99",
+    "несуществующая 1",
+    "",
+]
+
+
+async def search(messages: list[str], **kwargs: tp.Any) -> list[bytes]:
+    return [await get_data_from_db(msg, **kwargs) for msg in messages]
+
+
+async def test_backends_return_same_results(
+    codes_db: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "search_backend", "scan")
+    expected = await search(messages)
+    assert sum(result != EMPTY_PAYLOAD for result in expected) == 10
+
+    async with aiosqlite.connect(codes_db) as connection:
+        index = await CodesIndex.build(connection)
+    assert await search(messages, index=index) == expected
+
+    snapshot = CodesSnapshot.attach_or_build(codes_db, str(tmp_path / "codes.snap"))
+    try:
+        assert await search(messages, index=snapshot, payloads=snapshot) == expected
+    finally:
+        snapshot.close()
+
+    build_fts(codes_db)
+    monkeypatch.setattr(settings, "search_backend", "fts")
+    assert await search(messages) == expected
+
+    build_house_key(codes_db)
+    monkeypatch.setattr(settings, "house_key_lookup", True)
+    assert await search(messages) == expected
+    assert await search(messages, index=index) == expected
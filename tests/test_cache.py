@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+from src.services.cache import LRUCache, approximate_size
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """Текущее время time.monotonic, которое тест сдвигает сам"""
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_evicts_least_recently_used_by_entries() -> None:
+    cache = LRUCache(max_entries=2, max_bytes=1000, ttl=60, sizeof=lambda value: 1)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Чтение делает запись свежей, вытесняется b
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(cache) == 2
+    assert cache.evictions == 1
+
+
+def test_evicts_by_bytes() -> None:
+    cache = LRUCache(max_entries=10, max_bytes=10, ttl=60, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "xxxx")
+    cache.set("c", "xxxx")
+
+    assert cache.get("a") is None
+    assert cache.size_bytes == 8
+    assert cache.evictions == 1
+
+    # Значение больше всего кэша не сохраняется и ничего не вытесняет
+    cache.set("d", "x" * 11)
+    assert cache.get("d") is None
+    assert len(cache) == 2
+
+
+def test_replacing_key_updates_size() -> None:
+    cache = LRUCache(max_entries=10, max_bytes=10, ttl=60, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("a", "xx")
+
+    assert cache.get("a") == "xx"
+    assert cache.size_bytes == 2
+    assert len(cache) == 1
+
+
+def test_expires_after_ttl(clock: list[float]) -> None:
+    cache = LRUCache(max_entries=10, max_bytes=1000, ttl=60, sizeof=len)
+    cache.set("a", "xxxx")
+
+    clock[0] += 59
+    assert cache.get("a") == "xxxx"
+
+    clock[0] += 2
+    assert cache.get("a", "missing") == "missing"
+    assert len(cache) == 0
+    assert cache.size_bytes == 0
+
+
+def test_disabled_when_max_entries_is_zero() -> None:
+    cache = LRUCache(max_entries=0, max_bytes=1000, ttl=60)
+    cache.set("a", "xxxx")
+    assert cache.get("a") is None
+
+
+def test_stats_count_hits_misses_and_evictions() -> None:
+    cache = LRUCache(max_entries=1, max_bytes=1000, ttl=60, sizeof=len)
+    cache.set("a", "xx")
+    cache.get("a")
+    cache.get("b")
+    cache.set("b", "xxx")
+
+    assert cache.stats() == {
+        "entries": 1,
+        "bytes": 3,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+    cache.clear()
+    assert cache.stats()["entries"] == cache.stats()["bytes"] == 0
+
+
+def test_approximate_size_grows_with_value() -> None:
+    assert approximate_size("абв") == 49 + 6
+    assert approximate_size(b"abc") == 33 + 3
+    assert approximate_size({"a": [1, 2]}) == 64 + 50 + 56 + 32 * 2
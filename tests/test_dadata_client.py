@@ -0,0 +1,126 @@
+import time
+from collections.abc import AsyncGenerator, Callable
+
+import pytest
+
+from src.services.dadata_client import DadataClient, DadataUnavailableError
+from src.services.geocache import GeoCache
+from tests.fakes import ScriptedDadata
+
+MakeClient = Callable[..., DadataClient]
+
+
+@pytest.fixture
+async def make_client(
+    dadata: type[ScriptedDadata],
+) -> AsyncGenerator[MakeClient, None]:
+    clients = []
+
+    def make(**kwargs: float | bool | GeoCache) -> DadataClient:
+        client = DadataClient("test", base_url=dadata.url, http2=False, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.close()
+
+
+def warm_up_latencies(client: DadataClient, seconds: float) -> None:
+    for _ in range(20):
+        client.latencies.add(seconds)
+
+
+async def test_address_found(
+    make_client: MakeClient, dadata: type[ScriptedDadata]
+) -> None:
+    client = make_client()
+    assert await client.get_address_by_geo(55.0, 37.0) == "Москва Трофимова 1"
+    assert client.breaker.stats()["failures"] == 0
+
+
+async def test_error_status_raises_and_is_not_cached(
+    make_client: MakeClient, dadata: type[ScriptedDadata]
+) -> None:
+    cache = GeoCache(precision=8, ttl=60, max_entries=10)
+    client = make_client(cache=cache)
+    dadata.script = [(0.0, 500)]
+
+    with pytest.raises(DadataUnavailableError, match="500"):
+        await client.get_address_by_geo(55.0, 37.0)
+    assert client.breaker.failures == 1
+
+    # Ошибка не закэширована, следующий вызов идёт в Dadata
+    assert await client.get_address_by_geo(55.0, 37.0) == "Москва Трофимова 1"
+    assert dadata.requests == 2
+
+
+async def test_deadline(make_client: MakeClient, dadata: type[ScriptedDadata]) -> None:
+    client = make_client(deadline=0.1)
+    dadata.script = [(1.0, 200)]
+
+    started = time.perf_counter()
+    with pytest.raises(DadataUnavailableError, match="timed out"):
+        await client.geolocate(55.0, 37.0)
+    assert time.perf_counter() - started < 0.5
+    assert client.timeouts == 1
+
+
+async def test_breaker_opens_and_recovers(
+    make_client: MakeClient, dadata: type[ScriptedDadata]
+) -> None:
+    client = make_client(breaker_failures=2, breaker_reset=0.2)
+    dadata.script = [(0.0, 500), (0.0, 500)]
+
+    for _ in range(2):
+        with pytest.raises(DadataUnavailableError, match="500"):
+            await client.geolocate(55.0, 37.0)
+
+    # Размыкатель разомкнут: вызов отклоняется без запроса
+    with pytest.raises(DadataUnavailableError, match="circuit breaker"):
+        await client.geolocate(55.0, 37.0)
+    assert dadata.requests == 2
+    assert client.breaker.state == "open"
+
+    time.sleep(0.2)
+    assert await client.geolocate(55.0, 37.0) == dadata.answer
+    assert client.breaker.state == "closed"
+
+
+async def test_hedge_uses_faster_request(
+    make_client: MakeClient, dadata: type[ScriptedDadata]
+) -> None:
+    client = make_client(hedge=True, hedge_min_delay=0.05)
+    warm_up_latencies(client, 0.01)
+    dadata.script = [(1.0, 200), (0.0, 200)]
+
+    started = time.perf_counter()
+    assert await client.geolocate(55.0, 37.0) == dadata.answer
+    assert time.perf_counter() - started < 0.5
+    assert client.hedged == 1
+    assert dadata.requests == 2
+
+
+async def test_hedge_ignores_failed_request(
+    make_client: MakeClient, dadata: type[ScriptedDadata]
+) -> None:
+    client = make_client(hedge=True, hedge_min_delay=0.05)
+    warm_up_latencies(client, 0.01)
+    # Повторный запрос быстро получает ошибку, ответ первого всё равно ждётся
+    dadata.script = [(0.3, 200), (0.0, 500)]
+
+    assert await client.geolocate(55.0, 37.0) == dadata.answer
+    assert client.hedged == 1
+    assert client.breaker.failures == 0
+
+
+async def test_hedge_fails_when_both_fail(
+    make_client: MakeClient, dadata: type[ScriptedDadata]
+) -> None:
+    client = make_client(hedge=True, hedge_min_delay=0.05)
+    warm_up_latencies(client, 0.01)
+    dadata.script = [(0.2, 500), (0.0, 500)]
+
+    with pytest.raises(DadataUnavailableError, match="500"):
+        await client.geolocate(55.0, 37.0)
+    assert client.hedged == 1
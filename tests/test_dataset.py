@@ -0,0 +1,106 @@
+import sqlite3
+
+import pytest
+
+from src.api.config import settings
+from src.services import dataset as dataset_module
+from src.services.dataset import (
+    LOAD_ATTEMPTS,
+    CodesDataset,
+    DatabaseChangedError,
+    DatabaseSchemaError,
+    DatasetManager,
+)
+from src.services.migrations import (
+    FTS_TABLE,
+    HOUSE_KEY_INDEX,
+    build_fts,
+    build_house_key,
+)
+from src.services.payloads import EMPTY_PAYLOAD
+from src.storages.sqlite import get_db_version
+
+
+async def test_load_retries_when_database_changes(
+    codes_db: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    versions = iter(["changed"])
+    monkeypatch.setattr(
+        dataset_module,
+        "get_db_version",
+        lambda db_name: next(versions, None) or get_db_version(db_name),
+    )
+
+    dataset = await CodesDataset.load(codes_db)
+    try:
+        assert dataset.version == get_db_version(codes_db)
+        assert await dataset.get_data("трофимова 12") != EMPTY_PAYLOAD
+    finally:
+        await dataset.close()
+
+
+async def test_load_fails_when_database_keeps_changing(
+    codes_db: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls = 0
+
+    def changed(db_name: str) -> str:
+        nonlocal calls
+        calls += 1
+        return "changed"
+
+    monkeypatch.setattr(dataset_module, "get_db_version", changed)
+
+    with pytest.raises(DatabaseChangedError):
+        await CodesDataset.load(codes_db)
+    assert calls == LOAD_ATTEMPTS
+
+
+async def test_reload_keeps_dataset_without_fts_table(
+    codes_db: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    datasets = DatasetManager(codes_db)
+    await datasets.start()
+    try:
+        current = datasets.current
+        monkeypatch.setattr(settings, "search_backend", "fts")
+
+        with pytest.raises(DatabaseSchemaError, match=FTS_TABLE):
+            await datasets.reload(force=True)
+        assert datasets.current is current
+        assert not current.retired
+
+        build_fts(codes_db)
+        assert await datasets.reload(force=True)
+        assert current.retired
+    finally:
+        await datasets.stop()
+
+
+async def test_reload_keeps_dataset_without_house_key(
+    codes_db: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    datasets = DatasetManager(codes_db)
+    await datasets.start()
+    try:
+        current = datasets.current
+        monkeypatch.setattr(settings, "house_key_lookup", True)
+
+        with pytest.raises(DatabaseSchemaError, match="house_key"):
+            await datasets.reload(force=True)
+        assert datasets.current is current
+
+        # Колонка без индекса тоже не подходит
+        build_house_key(codes_db)
+        with sqlite3.connect(codes_db) as connection:
+            connection.execute(f"DROP INDEX {HOUSE_KEY_INDEX}")
+        connection.close()
+        with pytest.raises(DatabaseSchemaError, match=HOUSE_KEY_INDEX):
+            await datasets.reload(force=True)
+        assert datasets.current is current
+
+        build_house_key(codes_db)
+        assert await datasets.reload(force=True)
+        assert await datasets.current.get_data("трофимова 12") != EMPTY_PAYLOAD
+    finally:
+        await datasets.stop()
@@ -0,0 +1,30 @@
+import asyncio
+
+from src.vkbot.dispatcher import EventDispatcher, Job
+
+
+async def test_join_waits_for_deferred_jobs() -> None:
+    dispatcher = EventDispatcher(concurrency=2, queue_size=10)
+    done: list[tuple[int, int]] = []
+
+    def job(user: int, event: int, delay: float) -> Job:
+        async def run() -> None:
+            await asyncio.sleep(delay)
+            done.append((user, event))
+
+        return run
+
+    dispatcher.start()
+    try:
+        # Второе и третье события первого пользователя ждут в очереди задачи,
+        # которая выполняет его первое событие
+        await dispatcher.put(1, job(1, 1, 0.05))
+        await dispatcher.put(1, job(1, 2, 0.05))
+        await dispatcher.put(2, job(2, 1, 0))
+        await dispatcher.put(1, job(1, 3, 0))
+
+        await asyncio.wait_for(dispatcher.join(), 1)
+        assert sorted(done) == [(1, 1), (1, 2), (1, 3), (2, 1)]
+        assert [event for user, event in done if user == 1] == [1, 2, 3]
+    finally:
+        await dispatcher.stop()
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+
+import pytest
+from litestar import Response
+from litestar.response import Stream
+from litestar.testing import AsyncTestClient
+
+from src.api.config import settings
+from src.api.routes import accepts_gzip, export_codes
+
+
+@pytest.fixture(autouse=True)
+def export_token(monkeypatch: pytest.MonkeyPatch) -> str:
+    monkeypatch.setattr(settings, "export_token", "secret")
+    return "secret"
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected"),
+    [
+        ("", False),
+        ("gzip", True),
+        ("GZIP, deflate", True),
+        ("br;q=1.0, gzip;q=0.8", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.000", False),
+        ("*", True),
+        ("*;q=0", False),
+        ("*, gzip;q=0", False),
+        ("identity", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding: str, expected: bool) -> None:
+    assert accepts_gzip(accept_encoding) is expected
+
+
+async def test_export_requires_token(client: AsyncTestClient) -> None:
+    response = await client.get("/codes/export", headers={"X-Export-Token": "wrong"})
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip", "gzip;q=0"])
+async def test_export_streams_houses(
+    client: AsyncTestClient, export_token: str, accept_encoding: str
+) -> None:
+    response = await client.get(
+        "/codes/export",
+        params={"city": "мытищи"},
+        headers={"X-Export-Token": export_token, "Accept-Encoding": accept_encoding},
+    )
+    assert response.status_code == 200
+
+    if accept_encoding == "gzip":
+        assert response.headers["Content-Encoding"] == "gzip"
+    else:
+        assert "Content-Encoding" not in response.headers
+    # Клиент сам распаковывает gzip, тело сравнивается уже распакованным
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [(record["street"], record["house"]) for record in records] == [
+        ("2-я Лесная", "2"),
+        ("Лесной", "2а"),
+        ("Мира", "5"),
+    ]
+
+    # Набор данных освобождается после отправки потока
+    assert client.app.state.datasets.current.readers == 0
+
+
+async def test_export_empty_when_not_updated(
+    client: AsyncTestClient, export_token: str
+) -> None:
+    response = await client.get(
+        "/codes/export",
+        params={"updated_since": "2999-01-01T00:00:00Z"},
+        headers={"X-Export-Token": export_token},
+    )
+    assert response.status_code == 200
+    assert response.content == b""
+
+
+async def export(
+    client: AsyncTestClient, export_token: str, city: str | None = None
+) -> Stream | Response:
+    """Вызов обработчика напрямую, чтобы читать поток по частям"""
+    return await export_codes.fn(
+        state=client.app.state,
+        city=city,
+        street=None,
+        updated_since=None,
+        accept_encoding="",
+        export_token=export_token,
+    )
+
+
+async def test_export_reads_one_version_during_reload(
+    client: AsyncTestClient, codes_db: str, export_token: str
+) -> None:
+    datasets = client.app.state.datasets
+    dataset = datasets.current
+
+    stream = await export(client, export_token, city="мытищи")
+    # Новая база записывается рядом и заменяет старую, как при выкладке
+    shutil.copy(codes_db, f"{codes_db}.new")
+    with sqlite3.connect(f"{codes_db}.new") as connection:
+        connection.execute("DELETE FROM codes WHERE city = 'Мытищи'")
+    connection.close()
+    os.replace(f"{codes_db}.new", codes_db)
+    assert await datasets.reload(force=True)
+
+    # Старая версия не закрывается, пока выгрузка не отправлена
+    assert dataset.retired
+    assert dataset.readers == 1
+    body = b"".join([chunk async for chunk in stream.iterator])
+    assert len(body.splitlines()) == 3
+    assert dataset.readers == 0
+
+
+async def test_export_does_not_block_lookups(
+    client: AsyncTestClient, export_token: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "db_pool_size", 1)
+    monkeypatch.setattr(settings, "export_pool_size", 1)
+    monkeypatch.setattr(settings, "admission_queue_timeout", 0.05)
+    datasets = client.app.state.datasets
+    assert await datasets.reload(force=True)
+
+    # Выгрузка начата и остановлена клиентом после первой части
+    stream = await export(client, export_token)
+    assert isinstance(stream, Stream)
+    assert await anext(aiter(stream.iterator))
+
+    async with asyncio.timeout(1):
+        assert await datasets.current.get_data("ленина 1")
+
+    # Второй выгрузке не хватило соединения
+    shed = await export(client, export_token)
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == str(settings.admission_retry_after)
+
+    _ = [chunk async for chunk in stream.iterator]
+    assert isinstance(await export(client, export_token), Stream)
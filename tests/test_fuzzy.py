@@ -0,0 +1,21 @@
+import time
+
+from src.services.fuzzy import StreetMatcher
+
+matcher = StreetMatcher(["трофимова", "профсоюзная", "вернадского"], ["москва"])
+
+
+def test_correct_fixes_typo() -> None:
+    assert matcher.correct("Трафимова 1", max_distance=2, time_budget=1) == (
+        "трофимова 1"
+    )
+    assert matcher.correct("москва трофимова 1", max_distance=2, time_budget=1) is None
+
+
+def test_search_stops_at_deadline() -> None:
+    assert matcher.search("трафимова", 2) == [(1, "трофимова")]
+    assert matcher.search("трафимова", 2, deadline=time.perf_counter() - 1) == []
+
+
+def test_correct_discards_search_past_budget() -> None:
+    assert matcher.correct("Трафимова 1", max_distance=2, time_budget=0) is None
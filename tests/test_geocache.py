@@ -0,0 +1,82 @@
+import typing as tp
+
+import pytest
+
+from src.services.geocache import NOT_FOUND, GeoCache, geohash
+from tests.fakes import MemoryStorage
+
+
+@pytest.mark.parametrize(
+    ("lat", "lon", "precision", "expected"),
+    [
+        (57.64911, 10.40744, 11, "u4pruydqqvj"),
+        (42.6, -5.6, 5, "ezs42"),
+        (-25.382708, -49.265506, 7, "6gkzwgj"),
+    ],
+)
+def test_geohash_known_vectors(
+    lat: float, lon: float, precision: int, expected: str
+) -> None:
+    assert geohash(lat, lon, precision) == expected
+
+
+def test_points_of_one_cell_share_key() -> None:
+    cache = GeoCache(precision=8, ttl=60, max_entries=10)
+    assert cache.key(55.75580, 37.61730) == cache.key(55.75581, 37.61731)
+    assert cache.key(55.75580, 37.61730) != cache.key(55.75700, 37.61730)
+
+
+async def test_set_writes_both_tiers() -> None:
+    storage = MemoryStorage()
+    cache = GeoCache(
+        precision=8, ttl=60, max_entries=10, storage=tp.cast(tp.Any, storage)
+    )
+
+    assert await cache.get(55.7558, 37.6173) is None
+    await cache.set(55.7558, 37.6173, "Москва, улица Тверская, дом 1")
+    await cache.set(55.7, 37.5, None)
+
+    key = cache.key(55.7558, 37.6173)
+    assert storage.data[key] == "Москва, улица Тверская, дом 1"
+    assert storage.ttls[key] == 60
+    assert await cache.get(55.7558, 37.6173) == "Москва, улица Тверская, дом 1"
+    # Отсутствие адреса кэшируется и отличается от отсутствия точки
+    assert await cache.get(55.7, 37.5) == NOT_FOUND
+    assert cache.stats()["local_hits"] == 2
+
+
+async def test_storage_hit_fills_local_cache() -> None:
+    storage = MemoryStorage()
+    # Другой воркер уже записал адрес в общее хранилище
+    other = GeoCache(
+        precision=8, ttl=60, max_entries=10, storage=tp.cast(tp.Any, storage)
+    )
+    await other.set(55.7558, 37.6173, "Москва, улица Тверская, дом 1")
+
+    cache = GeoCache(
+        precision=8, ttl=60, max_entries=10, storage=tp.cast(tp.Any, storage)
+    )
+    assert await cache.get(55.7558, 37.6173) == "Москва, улица Тверская, дом 1"
+    storage.data.clear()
+    assert await cache.get(55.7558, 37.6173) == "Москва, улица Тверская, дом 1"
+
+    assert cache.stats() == {
+        "entries": 1,
+        "local_hits": 1,
+        "storage_hits": 1,
+        "misses": 0,
+        "hit_rate": 1.0,
+    }
+
+
+async def test_storage_errors_fall_back_to_local_cache() -> None:
+    storage = MemoryStorage()
+    storage.failing = True
+    cache = GeoCache(
+        precision=8, ttl=60, max_entries=10, storage=tp.cast(tp.Any, storage)
+    )
+
+    assert await cache.get(55.7558, 37.6173) is None
+    await cache.set(55.7558, 37.6173, "Москва, улица Тверская, дом 1")
+    assert await cache.get(55.7558, 37.6173) == "Москва, улица Тверская, дом 1"
+    assert cache.stats()["misses"] == 1
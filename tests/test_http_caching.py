@@ -0,0 +1,46 @@
+from litestar.testing import AsyncTestClient
+
+from tests.fakes import ScriptedDadata
+
+
+async def test_msg_not_modified(client: AsyncTestClient) -> None:
+    response = await client.get("/codes/msg", params={"message": "трофимова 1"})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"]
+
+    response = await client.get(
+        "/codes/msg",
+        params={"message": "трофимова 12"},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+
+
+async def test_geo_from_dadata_is_cacheable_but_not_revalidated(
+    client: AsyncTestClient, dadata: type[ScriptedDadata]
+) -> None:
+    response = await client.get("/codes/geo", params={"lat": 55.0, "lon": 37.0})
+    assert response.status_code == 200
+    assert "Трофимова" in response.json()["address"]
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"]
+
+    # Другая точка с тем же ETag отвечает полностью
+    response = await client.get(
+        "/codes/geo", params={"lat": 56.0, "lon": 38.0}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()
+    assert dadata.requests == 2
+
+
+async def test_geo_dadata_error_is_not_cacheable(
+    client: AsyncTestClient, dadata: type[ScriptedDadata]
+) -> None:
+    dadata.script = [(0.0, 500)]
+
+    response = await client.get("/codes/geo", params={"lat": 55.0, "lon": 37.0})
+    assert response.status_code == 503
+    assert response.headers["Cache-Control"] == "no-store"
+    assert "ETag" not in response.headers
@@ -0,0 +1,100 @@
+import random
+import sqlite3
+
+import aiosqlite
+import pytest
+
+from src.services.locator import (
+    COORDS_TABLE,
+    METERS_PER_DEGREE,
+    HouseLocator,
+    distance,
+)
+
+
+def make_houses(
+    origin: tuple[float, float], count: int, step: float
+) -> list[tuple[int, str, str, str, str, float, float]]:
+    rng = random.Random(0)
+    return [
+        (
+            i,
+            "Москва",
+            "улица",
+            f"Улица {i // 10}",
+            str(i % 10 + 1),
+            origin[0] + rng.uniform(0, step * 20),
+            origin[1] + rng.uniform(0, step * 20),
+        )
+        for i in range(count)
+    ]
+
+
+def brute_force(
+    houses: list[tuple[int, str, str, str, str, float, float]],
+    lat: float,
+    lon: float,
+    max_distance: float,
+) -> tuple | None:
+    best = min(houses, key=lambda house: distance(lat, lon, house[5], house[6]))
+    if distance(lat, lon, best[5], best[6]) > max_distance:
+        return None
+    return best[:5]
+
+
+@pytest.mark.parametrize("origin", [(55.75, 37.6), (69.0, 33.0)])
+@pytest.mark.parametrize("max_distance", [30.0, 100.0])
+def test_nearest_matches_brute_force(
+    origin: tuple[float, float], max_distance: float
+) -> None:
+    houses = make_houses(origin, 300, step=0.001)
+    locator = HouseLocator(houses, max_distance)
+
+    rng = random.Random(1)
+    found = 0
+    for _ in range(500):
+        lat = origin[0] + rng.uniform(-0.002, 0.022)
+        lon = origin[1] + rng.uniform(-0.002, 0.022)
+        expected = brute_force(houses, lat, lon, max_distance)
+        assert locator.nearest(lat, lon) == expected
+        found += expected is not None
+
+    assert 0 < found < 500
+    assert locator.stats()["hits"] == found
+
+
+def test_max_distance_cutoff() -> None:
+    house = (7, "Москва", "улица", "Трофимова", "1", 55.7, 37.6)
+    locator = HouseLocator([house], max_distance=50)
+
+    # Точки севернее дома на 40 и 60 метров
+    assert locator.nearest(55.7 + 40 / METERS_PER_DEGREE, 37.6) == house[:5]
+    assert locator.nearest(55.7 + 60 / METERS_PER_DEGREE, 37.6) is None
+    assert locator.stats() == {"houses": 1, "hits": 1, "misses": 1}
+
+
+async def test_build_from_database(codes_db: str) -> None:
+    async with aiosqlite.connect(codes_db) as connection:
+        assert await HouseLocator.build(connection, max_distance=50) is None
+
+    with sqlite3.connect(codes_db) as connection:
+        connection.execute(f"""
+            CREATE TABLE {COORDS_TABLE} (
+                city TEXT, street_type TEXT, street TEXT, house TEXT, lat REAL, lon REAL
+            )
+        """)
+        connection.executemany(
+            f"INSERT INTO {COORDS_TABLE} VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                ("Москва", "улица", "Трофимова", "12", 55.7, 37.6),
+                # Дом без кодов не попадает в поиск
+                ("Москва", "улица", "Трофимова", "99", 55.7001, 37.6),
+            ],
+        )
+    connection.close()
+
+    async with aiosqlite.connect(codes_db) as connection:
+        locator = await HouseLocator.build(connection, max_distance=50)
+    assert locator is not None
+    # id первой строки дома в codes: по 4 строки на дом, это третий дом
+    assert locator.nearest(55.7001, 37.6) == (9, "Москва", "улица", "Трофимова", "12")
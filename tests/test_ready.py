@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from litestar.testing import AsyncTestClient
+
+from src.api.app import app
+from src.api.config import settings
+from src.services.dataset import CodesDataset
+
+
+async def wait_for_warmup(client: AsyncTestClient) -> None:
+    state = client.app.state
+    async with asyncio.timeout(1):
+        while state.ready_in is None and state.warmup_error is None:
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def warmup_settings(codes_db: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "db_watch_interval", 0)
+    monkeypatch.setattr(settings, "warmup_queries", 2)
+    monkeypatch.setattr(settings, "geo_local_max_distance", 0)
+
+
+async def test_ready_after_warmup(warmup_settings: None) -> None:
+    async with AsyncTestClient(app) as client:
+        await wait_for_warmup(client)
+        response = await client.get("/ready")
+
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
+
+
+async def test_not_ready_when_warmup_fails(
+    warmup_settings: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    async def fail(self: CodesDataset, queries: int) -> None:
+        raise OSError("disk I/O error")
+
+    monkeypatch.setattr(CodesDataset, "warmup", fail)
+
+    async with AsyncTestClient(app) as client:
+        await wait_for_warmup(client)
+        response = await client.get("/ready")
+
+        assert response.status_code == 503
+        assert response.json() == {
+            "ready": False,
+            "error": "Warmup failed: OSError('disk I/O error')",
+        }
@@ -0,0 +1,78 @@
+import random
+import time
+import typing as tp
+
+import pytest
+
+from src.services.shared_cache import SharedResultCache
+from tests.fakes import MemoryStorage
+
+
+def shared_cache(storage: MemoryStorage, version: str = "v1") -> SharedResultCache:
+    return SharedResultCache(tp.cast(tp.Any, storage), version=version, ttl=60)
+
+
+async def test_returns_stored_payload(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(random, "random", lambda: 0.0)
+    storage = MemoryStorage()
+    cache = shared_cache(storage)
+
+    assert await cache.get("трофимова 1") is None
+    await cache.set("трофимова 1", b'{"address":"1"}', delta=0.01)
+    assert await cache.get("трофимова 1") == b'{"address":"1"}'
+
+    assert list(storage.ttls.values()) == [60]
+    # Другая версия данных не видит записи старой
+    assert await shared_cache(storage, version="v2").get("трофимова 1") is None
+    assert cache.stats() == {
+        "hits": 1,
+        "early_refreshes": 0,
+        "misses": 1,
+        "errors": 0,
+        "hit_rate": 0.5,
+    }
+
+
+@pytest.mark.parametrize(
+    ("draw", "delta", "elapsed", "refresh"),
+    [
+        # Без случайной добавки запись обновляется только после срока
+        (0.0, 1.0, 59.0, False),
+        (0.0, 1.0, 61.0, True),
+        # -log(1 - 0.5) * 1 с: ранний пересчёт за 0.69 с до срока
+        (0.5, 1.0, 59.0, False),
+        (0.5, 1.0, 59.5, True),
+        # Чем дольше вычисляется ответ, тем раньше он обновляется
+        (0.5, 10.0, 54.0, True),
+    ],
+)
+async def test_early_refresh(
+    monkeypatch: pytest.MonkeyPatch,
+    draw: float,
+    delta: float,
+    elapsed: float,
+    refresh: bool,
+) -> None:
+    now = 1_700_000_000.0
+    monkeypatch.setattr(time, "time", lambda: now)
+    monkeypatch.setattr(random, "random", lambda: draw)
+    cache = shared_cache(MemoryStorage())
+    await cache.set("key", b"payload", delta=delta)
+
+    now += elapsed
+    assert (await cache.get("key") is None) is refresh
+    assert cache.early_refreshes == int(refresh)
+
+
+async def test_storage_errors_fall_back_to_miss() -> None:
+    storage = MemoryStorage()
+    cache = shared_cache(storage)
+    await cache.set("key", b"payload", delta=0.01)
+
+    storage.failing = True
+    assert await cache.get("key") is None
+    await cache.set("key", b"other", delta=0.01)
+    assert cache.errors == 2
+
+    storage.failing = False
+    assert await cache.get("key") == b"payload"
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from src.services.singleflight import SingleFlight
+
+
+async def test_coalesces_concurrent_calls() -> None:
+    flights = SingleFlight()
+    release = asyncio.Event()
+    runs = 0
+
+    async def fetch() -> str:
+        nonlocal runs
+        runs += 1
+        await release.wait()
+        return "result"
+
+    waiters = [asyncio.create_task(flights.do("key", fetch)) for _ in range(5)]
+    other = asyncio.create_task(flights.do("other", fetch))
+    await asyncio.sleep(0)
+    assert flights.stats() == {"calls": 2, "coalesced": 4, "in_flight": 2}
+
+    release.set()
+    assert await asyncio.gather(*waiters, other) == ["result"] * 6
+    assert runs == 2
+    assert flights.stats()["in_flight"] == 0
+
+    # Завершённый вызов не кэшируется, следующий выполняется заново
+    assert await flights.do("key", fetch) == "result"
+    assert runs == 3
+
+
+async def test_error_is_raised_in_every_waiter() -> None:
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def fail() -> None:
+        await release.wait()
+        raise ValueError("lookup failed")
+
+    waiters = [asyncio.create_task(flights.do("key", fail)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert [str(result) for result in results] == ["lookup failed"] * 3
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.stats()["in_flight"] == 0
+
+
+async def test_cancelled_waiter_does_not_cancel_call() -> None:
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch() -> str:
+        await release.wait()
+        return "result"
+
+    first = asyncio.create_task(flights.do("key", fetch))
+    second = asyncio.create_task(flights.do("key", fetch))
+    await asyncio.sleep(0)
+
+    # Отмена того, кто начал вызов, не мешает остальным получить результат
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    release.set()
+    assert await second == "result"
+
+
+async def test_call_finishes_when_every_waiter_is_cancelled() -> None:
+    flights = SingleFlight()
+    release = asyncio.Event()
+    finished = asyncio.Event()
+
+    async def fail() -> None:
+        await release.wait()
+        finished.set()
+        raise ValueError("lookup failed")
+
+    waiter = asyncio.create_task(flights.do("key", fail))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    release.set()
+    await asyncio.wait_for(finished.wait(), 1)
+    await asyncio.sleep(0)
+    assert flights.stats()["in_flight"] == 0
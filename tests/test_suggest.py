@@ -0,0 +1,71 @@
+import random
+
+from src.services.suggest import AddressSuggester, normalize_suggest_text
+
+cities = ["Москва", "Мытищи", "Санкт-Петербург"]
+street_names = ["Мира", "Мичурина", "Маршала Жукова", "Лесная", "Лесной", "Ленина"]
+
+
+def brute_force(
+    houses: list[tuple[str, str, str, str, int]], query: str
+) -> list[dict[str, str | int]]:
+    """Проверка всех домов: префикс ищется в ключах "улица дом" и
+    "город улица дом", дома сортируются по количеству кодов
+    """
+    prefix = normalize_suggest_text(query)
+    matching = [
+        {"address": f"{city}, {street_type} {street}, дом {house}", "codes": count}
+        for city, street_type, street, house, count in houses
+        if any(
+            normalize_suggest_text(key).startswith(prefix)
+            for key in (f"{street} {house}", f"{city} {street} {house}")
+        )
+    ]
+    return sorted(matching, key=lambda item: -item["codes"])
+
+
+def test_suggest_matches_brute_force() -> None:
+    rng = random.Random(0)
+    addresses = {
+        (city, street_type, street, str(rng.randint(1, 40)))
+        for city in cities
+        for street_type in ("улица", "проспект")
+        for street in street_names
+        for _ in range(10)
+    }
+    houses = [(*address, rng.randint(1, 50)) for address in sorted(addresses)]
+    suggester = AddressSuggester(houses)
+
+    queries = ["м", "ми", "мира 1", "лес", "Мытищи, ул. Лесная", "санкт", "ленина 3"]
+    queries += [rng.choice(street_names)[: rng.randint(1, 5)] for _ in range(50)]
+    for query in queries:
+        expected = brute_force(houses, query)
+        matching = {item["address"] for item in expected}
+        for limit in (1, 5, 20, 1000):
+            result = suggester.suggest(query, limit=limit)
+
+            # Порядок домов с равным количеством кодов не задан
+            assert [item["codes"] for item in result] == [
+                item["codes"] for item in expected[:limit]
+            ], query
+            assert {item["address"] for item in result} <= matching
+            assert len({item["address"] for item in result}) == len(result)
+
+
+def test_suggest_ignores_street_types_and_case() -> None:
+    suggester = AddressSuggester(
+        [
+            ("Москва", "улица", "Мира", "5", 3),
+            ("Москва", "проспект", "Мира", "5", 7),
+            ("Мытищи", "улица", "Мира", "5", 1),
+        ]
+    )
+
+    assert suggester.suggest("ПРОСПЕКТ мира 5", limit=2) == [
+        {"address": "Москва, проспект Мира, дом 5", "codes": 7},
+        {"address": "Москва, улица Мира, дом 5", "codes": 3},
+    ]
+    assert suggester.suggest("мытищи, мира") == [
+        {"address": "Мытищи, улица Мира, дом 5", "codes": 1}
+    ]
+    assert suggester.suggest("   ") == []
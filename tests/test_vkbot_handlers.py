@@ -0,0 +1,106 @@
+import json
+import threading
+import typing as tp
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from src.vkbot.config import settings
+from src.vkbot.handlers import UNAVAILABLE_MESSAGE, MessageHandler
+
+
+class UnavailableApi(BaseHTTPRequestHandler):
+    """API, отвечающее 503, как при перегрузке или недоступной Dadata"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        data = b'{"status_code":503,"detail":"Dadata is unavailable"}'
+        self.wfile.write(
+            b"HTTP/1.1 503 -\r\nContent-Type: application/json\r\n"
+            b"Retry-After: 1\r\n"
+            + f"Content-Length: {len(data)}\r\n\r\n".encode()
+            + data
+        )
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def unavailable_api(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), UnavailableApi)
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    monkeypatch.setattr(settings, "domofomka_api_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "domofomka_api_port", server.server_port)
+    yield
+    server.shutdown()
+    server.server_close()
+
+
+def fake_vk(sent: list[dict]) -> tp.Any:
+    """VK API, запоминающий отправленные сообщения и ответы на нажатия"""
+    return SimpleNamespace(
+        groups=SimpleNamespace(isMember=lambda **params: 1),
+        messages=SimpleNamespace(
+            send=lambda **params: sent.append(params),
+            sendMessageEventAnswer=lambda **params: sent.append(params),
+            getByConversationMessageId=lambda **params: {
+                "items": [{"text": "Москва, улица Трофимова, дом 1\nПодъезд 1"}]
+            },
+        ),
+    )
+
+
+class EmptyRedis:
+    async def get(self, key: str) -> None:
+        return None
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        {"from_id": 1, "text": "трофимова 1"},
+        {
+            "from_id": 1,
+            "text": "",
+            "geo": {"coordinates": {"latitude": 55.7, "longitude": 37.6}},
+        },
+    ],
+)
+async def test_unavailable_api_answers_try_later(
+    unavailable_api: None, message: dict
+) -> None:
+    sent: list[dict] = []
+    handler = MessageHandler(fake_vk(sent), tp.cast(tp.Any, EmptyRedis()))
+
+    await handler.handle_message({"message": message})
+
+    assert [params["message"] for params in sent] == [UNAVAILABLE_MESSAGE]
+
+
+async def test_unavailable_api_on_button_shows_snackbar(
+    unavailable_api: None,
+) -> None:
+    sent: list[dict] = []
+    handler = MessageHandler(fake_vk(sent), tp.cast(tp.Any, EmptyRedis()))
+
+    await handler.handle_event(
+        {
+            "user_id": 1,
+            "peer_id": 1,
+            "event_id": "event",
+            "conversation_message_id": 1,
+            "payload": {"entrance": "1", "ent_slice": ["1"]},
+        }
+    )
+
+    assert [json.loads(params["event_data"]) for params in sent] == [
+        {"type": "show_snackbar", "text": UNAVAILABLE_MESSAGE}
+    ]